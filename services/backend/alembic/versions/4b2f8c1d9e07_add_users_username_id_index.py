@@ -0,0 +1,47 @@
+"""Add composite username, id index for keyset pagination
+
+Revision ID: 4b2f8c1d9e07
+Revises: dfae958e3d50
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b2f8c1d9e07'
+down_revision: Union[str, Sequence[str], None] = 'dfae958e3d50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction; it keeps the users table
+    # writable while the index is being built.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_username_id', 'users', ['username', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        # The composite index also serves every lookup by username alone
+        op.drop_index(
+            op.f('ix_users_username'), table_name='users',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_users_username'), 'users', ['username'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_users_username_id', table_name='users',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,43 @@
+"""Add pg_trgm GIN indexes for admin user search
+
+Revision ID: 9d3a6e5f2c41
+Revises: 4b2f8c1d9e07
+Create Date: 2026-10-18 11:04:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3a6e5f2c41'
+down_revision: Union[str, Sequence[str], None] = '4b2f8c1d9e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_username_trgm', 'users', ['username'],
+            unique=False, postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_email_trgm', 'users', ['email'],
+            unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_email_trgm', table_name='users', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_username_trgm', table_name='users', postgresql_concurrently=True, if_exists=True)
+    # The pg_trgm extension is left in place: other objects may depend on it
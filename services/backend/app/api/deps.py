@@ -5,10 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.core import security
 from app.core.logger import logger
 from app.core.config import settings
-from app.core.redis import redis_client
-from app.db.session import get_db
+from app.core.principal_cache import principal_cache, principal_from_user, user_from_principal
+from app.core.sessions import sessions
+from app.db.routing import get_read_db
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
@@ -17,12 +19,10 @@ reusable_oauth2 = OAuth2PasswordBearer(
 )
 
 async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
+    db: AsyncSession = Depends(get_read_db), token: str = Depends(reusable_oauth2)
 ) -> User:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_token(token)
         token_data = TokenPayload(**payload)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -31,48 +31,64 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     except (JWTError, Exception) as e:
-        logger.error(f"JWT decode error: {e}")
+        logger.error("JWT decode error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Refresh tokens are only good for /auth/refresh and /auth/logout
+    if token_data.sub is None or token_data.type == "refresh":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Check denylist in Redis
-    if token_data.jti:
+    # Reads of a user who has just written go to the primary, here and in the
+    # endpoint if it shares this read session (app.db.routing)
+    db.info["user_id"] = token_data.sub
+
+    # Most requests are served from the principal cache without touching the DB.
+    # The record also carries the user's session generation, so checking for
+    # revoked tokens costs no extra round trip.
+    record = await principal_cache.get(token_data.sub)
+    if record is not None:
+        user = user_from_principal(record)
+        gen = record["gen"]
+    else:
+        result = await db.execute(
+            select(User)
+            .where(User.id == token_data.sub)
+            .options(selectinload(User.role_obj))
+        )
+        user = result.scalar_one_or_none()
+        # Ends the read transaction: the connection goes back to the pool instead
+        # of being held next to the endpoint's own session until the response
+        await db.commit()
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
         try:
-            is_revoked = await redis_client.exists(f"denylist:{token_data.jti}")
-            if is_revoked:
+            gen = await sessions.generation(user.id)
+        except Exception as e:
+            # Redis is down (or the circuit is open and we didn't even try)
+            if not settings.DENYLIST_FAIL_OPEN:
                 raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has been revoked",
-                    headers={"WWW-Authenticate": "Bearer"},
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Service temporarily unavailable, please try later"
                 )
-        except HTTPException:
-            raise
-        except Exception:
-            # Redis is down
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Service temporarily unavailable, please try later"
-            )
+            logger.warning("Session generation check skipped, Redis unavailable: %s", e)
+            return user
+        await principal_cache.set(principal_from_user(user, gen))
 
-    if token_data.sub is None:
+    if token_data.gen != gen:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    result = await db.execute(
-        select(User)
-        .where(User.id == token_data.sub)
-        .options(selectinload(User.role_obj))
-    )
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 async def get_current_active_user(
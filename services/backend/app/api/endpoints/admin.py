@@ -1,14 +1,30 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timezone
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import Integer, any_, bindparam, select, func, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.principal_cache import principal_cache
+from app.core.user_import import ImportBusyError, ImportFormatError, UserImport
+from app.db.estimates import query_row_estimate, table_row_estimate
+from app.db.routing import get_read_db, replica_router
 from app.db.session import get_db
 from app.models.user import User
 from app.models.role import Role
-from app.schemas.user import User as UserSchema
+from app.schemas.user import User as UserSchema, UserBulkAction, UserBulkResult, UserImportReport, UserPage
 
 router = APIRouter(
     tags=["admin"],
@@ -17,63 +33,411 @@ router = APIRouter(
 
 # Описание тега: Панель администратора: управление пользователями и системные настройки.
 
+# Allowed sort keys. Each one is served by an index: non-unique columns by a
+# composite (column, id) index, so ORDER BY column, id never needs an explicit
+# sort step and keyset pagination can seek straight to the cursor position.
+SORT_COLUMNS = {
+    "name": User.username,      # ix_users_username_id
+    "username": User.username,  # ix_users_username_id
+    "email": User.email,        # ix_users_email (unique)
+    "id": User.id,              # primary key
+}
+# Columns that are unique on their own and need no id tie-breaker
+UNIQUE_SORT_COLUMNS = {"email", "id"}
+# Orders search results by trigram similarity to the search term
+RELEVANCE_SORT = "relevance"
+
+# username and email have pg_trgm GIN indexes (ix_users_*_trgm). A term shorter
+# than three characters yields no usable trigrams and would scan the whole table.
+MIN_SEARCH_LENGTH = 3
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def apply_user_filters(query, search: str | None, role: str | None, search_mode: str = "substring"):
+    if search:
+        term = search.strip()
+        if len(term) < MIN_SEARCH_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Search term must be at least {MIN_SEARCH_LENGTH} characters long",
+            )
+        if search_mode == "fuzzy":
+            # pg_trgm similarity operator, tolerant to typos
+            filters = [User.username.op("%")(term), User.email.op("%")(term)]
+        else:
+            search_filter = f"%{escape_like(term)}%"
+            filters = [
+                User.username.ilike(search_filter, escape="\\"),
+                User.email.ilike(search_filter, escape="\\"),
+            ]
+        query = query.where(or_(*filters))
+
+    if role:
+        query = query.join(User.role_obj).where(Role.name == role)
+    return query
+
+def search_relevance(search: str):
+    term = search.strip()
+    return func.greatest(func.similarity(User.username, term), func.similarity(User.email, term))
+
+# Exact totals per filter combination, shared by all admins hitting this worker
+count_cache = TTLCache(maxsize=1024, ttl=settings.ADMIN_COUNT_CACHE_TTL)
+
+async def count_users(db: AsyncSession, query, count: str, cache_key: tuple) -> tuple[int | None, bool]:
+    """Returns (total, is_estimate) for the filtered query according to the `count` mode."""
+    if count == "none":
+        return None, False
+
+    if count == "estimated":
+        filtered = any(cache_key)
+        estimate = None if filtered else await table_row_estimate(db, User.__tablename__)
+        if estimate is None:
+            estimate = await query_row_estimate(db, query)
+        return estimate, True
+
+    total = count_cache.get(cache_key)
+    if total is None:
+        total_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(total_query)
+        total = total_result.scalar() or 0
+        count_cache.set(cache_key, total)
+    return total, False
+
+def parse_sort(sort: str) -> tuple[str, bool]:
+    field, _, order = (sort or "username:asc").partition(":")
+    if field == RELEVANCE_SORT:
+        return field, True
+    if field not in SORT_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported sort field '{field}'. Allowed: {', '.join(SORT_COLUMNS)}",
+        )
+    if order not in ("", "asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unsupported sort order '{order}'")
+    return field, order == "desc"
+
+def encode_cursor(field: str, desc: bool, user: User) -> str:
+    value = getattr(user, SORT_COLUMNS[field].key)
+    raw = json.dumps([field, desc, value, user.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, field: str, desc: bool) -> tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_field, cursor_desc, value, last_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_field != field or cursor_desc != desc:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    return value, int(last_id)
+
 @router.get(
     "/users",
-    response_model=Any,
+    response_model=UserPage,
     summary="Список пользователей",
-    description="Возвращает список всех пользователей системы с поддержкой фильтрации по имени, роли, а также с пагинацией и сортировкой. Доступно только администраторам.",
-    response_description="Список пользователей и общее количество записей."
+    description=(
+        "Возвращает список всех пользователей системы с поддержкой фильтрации по имени, роли, а также с пагинацией и сортировкой. "
+        "Сортировка возможна только по индексированным полям: name, username, email, id. "
+        "Поиск (не короче 3 символов) использует триграммные индексы pg_trgm: search_mode=substring ищет подстроку, "
+        "search_mode=fuzzy находит похожие значения с учётом опечаток; sort=relevance упорядочивает результаты по степени сходства. "
+        "Режим pagination=cursor использует keyset-пагинацию: ответ содержит непрозрачный next_cursor, "
+        "который передаётся в параметре cursor для получения следующей страницы. Стоимость запроса не зависит от номера страницы. "
+        "Параметр count управляет подсчётом total: exact — точное значение (кэшируется на короткое время для каждого набора фильтров), "
+        "estimated — оценка планировщика PostgreSQL без полного подсчёта, none — без подсчёта. "
+        "Запрос выполняется на реплике, если она настроена и не отстаёт больше допустимого; "
+        "сразу после изменений, сделанных администратором, — на основном сервере. "
+        "Доступно только администраторам."
+    ),
+    response_description="Список пользователей, общее (точное или оценочное) количество записей и курсор следующей страницы (в режиме cursor)."
 )
 async def read_users(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
+    search_mode: str = Query("substring", pattern="^(substring|fuzzy)$"),
     role: str = Query(None),
     sort: str = Query("name:asc"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: str = Query(None),
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
     current_user: User = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Retrieve users for admin dashboard.
     """
-    query = select(User)
-    
+    field, desc = parse_sort(sort)
+    if cursor:
+        pagination = "cursor"
+
+    if field == RELEVANCE_SORT:
+        if not search:
+            raise HTTPException(status_code=400, detail="Sorting by relevance requires a search term")
+        if pagination == "cursor":
+            raise HTTPException(status_code=400, detail="Sorting by relevance supports only offset pagination")
+
     # Filtering
-    if search:
-        search_filter = f"%{search}%"
-        filters = [
-            User.username.ilike(search_filter),
-            User.email.ilike(search_filter),
-        ]
-        query = query.where(or_(*filters))
-    
-    if role:
-        query = query.join(User.role_obj).where(Role.name == role)
+    query = apply_user_filters(select(User), search, role, search_mode)
     
     # Count total users after filtering but before pagination and options
-    total_query = select(func.count(User.id)).select_from(query.subquery())
-    total_result = await db.execute(total_query)
-    total = total_result.scalar() or 0
+    cache_key = (search.strip() if search else None, search_mode if search else None, role)
+    total, total_estimated = await count_users(db, query, count, cache_key)
     
-    # Add relations and sorting
+    # Add relations and sorting (the sort key plus id as a unique tie-breaker)
     query = query.options(selectinload(User.role_obj))
+    if field == RELEVANCE_SORT:
+        query = query.order_by(search_relevance(search).desc(), User.id.asc())
+    else:
+        column = SORT_COLUMNS[field]
+        order_by = [column] if field in UNIQUE_SORT_COLUMNS else [column, User.id]
+        query = query.order_by(*[c.desc() if desc else c.asc() for c in order_by])
     
-    if sort and ":" in sort:
+    if pagination == "offset":
+        query = query.offset((page - 1) * limit).limit(limit)
+        result = await db.execute(query)
+        users = result.scalars().all()
+        return ORJSONResponse({
+            "users": [u.serialization() for u in users],
+            "total": total,
+            "total_estimated": total_estimated,
+        })
+
+    # Keyset pagination: seek past the last row of the previous page
+    if cursor:
+        value, last_id = decode_cursor(cursor, field, desc)
+        if field in UNIQUE_SORT_COLUMNS:
+            value = last_id if column is User.id else value
+            position = column < value if desc else column > value
+        else:
+            key = tuple_(column, User.id)
+            position = key < tuple_(value, last_id) if desc else key > tuple_(value, last_id)
+        query = query.where(position)
+
+    result = await db.execute(query.limit(limit + 1))
+    users = result.scalars().all()
+    next_cursor = encode_cursor(field, desc, users[limit - 1]) if len(users) > limit else None
+    return ORJSONResponse({
+        "users": [u.serialization() for u in users[:limit]],
+        "total": total,
+        "total_estimated": total_estimated,
+        "next_cursor": next_cursor,
+    })
+
+@router.post(
+    "/users/bulk",
+    response_model=UserBulkResult,
+    summary="Массовые операции с пользователями",
+    description=(
+        "Активирует, деактивирует или назначает роль сразу многим пользователям одним запросом UPDATE. "
+        "Пользователи задаются списком ids (до 10000) либо фильтром filter с теми же полями search, search_mode и role, что и в списке пользователей. "
+        "Если по фильтру должно измениться больше ADMIN_BULK_MAX_ROWS пользователей, запрос отклоняется с кодом 400 и ничего не меняется. "
+        "Обновляются только строки, которые действительно меняются. Собственную учётную запись администратора "
+        "нельзя деактивировать или лишить роли этим методом, она пропускается. "
+        "Кэш пользователей сбрасывается, а при деактивации все выданные ранее refresh-токены аннулируются. "
+        "Если при деактивации или смене роли не удаётся сбросить кэш или аннулировать токены (Redis недоступен), "
+        "изменения отменяются и возвращается код 503. "
+        "Доступно только администраторам."
+    ),
+    response_description="Действие, число изменённых пользователей и число пользователей с аннулированными токенами."
+)
+async def bulk_update_users(
+    bulk_in: UserBulkAction,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    # Only rows that actually change, so the returned ids are the affected ones
+    if bulk_in.action == "activate":
+        changes, values = [User.is_active.is_not(True)], {"is_active": True}
+    elif bulk_in.action == "deactivate":
+        changes, values = [User.is_active.is_not(False), User.id != current_user.id], {"is_active": False}
+    else:
+        role_id = (await db.execute(select(Role.id).where(Role.name == bulk_in.role))).scalar_one_or_none()
+        if role_id is None:
+            raise HTTPException(status_code=400, detail=f"Role '{bulk_in.role}' not found")
+        changes, values = [User.role_id.is_distinct_from(role_id), User.id != current_user.id], {"role_id": role_id}
+
+    if bulk_in.ids is not None:
+        # One array parameter instead of an IN list with a bind per id
+        target = User.id == any_(bindparam("ids", bulk_in.ids, type_=ARRAY(Integer)))
+    else:
+        # A broad filter is refused rather than rewriting the whole table:
+        # at most one row over the limit is updated before the rollback
+        f = bulk_in.filter
+        matched = apply_user_filters(select(User.id), f.search, f.role, f.search_mode).where(*changes)
+        target = User.id.in_(matched.limit(settings.ADMIN_BULK_MAX_ROWS + 1))
+
+    stmt = update(User).where(target, *changes).values(**values)
+    result = await db.execute(stmt.returning(User.id).execution_options(synchronize_session=False))
+    updated_ids = result.scalars().all()
+    if len(updated_ids) > settings.ADMIN_BULK_MAX_ROWS:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Filter matches more than {settings.ADMIN_BULK_MAX_ROWS} users to update, narrow it down",
+        )
+
+    revoke = bulk_in.action == "deactivate"
+    if bulk_in.action != "activate":
+        # Invalidated (and tokens revoked) before the commit: if Redis is down
+        # nothing changes, instead of deactivated users keeping working tokens
+        # or demoted admins their cached role
         try:
-            field, order = sort.split(":")
-            attr = getattr(User, field, User.username)
-            if order == "desc":
-                query = query.order_by(attr.desc())
-            else:
-                query = query.order_by(attr.asc())
+            await principal_cache.invalidate(*updated_ids, revoke_tokens=revoke, strict=True)
         except Exception:
-            query = query.order_by(User.username.asc())
+            await db.rollback()
+            raise HTTPException(
+                status_code=503,
+                detail="User cache invalidation is unavailable, no users were updated",
+            )
+        await db.commit()
     else:
-        query = query.order_by(User.username.asc())
-    
-    # Pagination
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    users = result.scalars().all()
-    
-    return {"users": [u.serialization() for u in users], "total": total}
+        await db.commit()
+        await principal_cache.invalidate(*updated_ids)
+    # The admin's next listing must show the change, not a lagging replica
+    await replica_router.stick(current_user.id)
+    count_cache.clear()
+
+    logger.info(
+        "Bulk %s by admin %s: %s users updated", bulk_in.action, current_user.id, len(updated_ids),
+        extra={"action": bulk_in.action, "admin_id": current_user.id, "updated": len(updated_ids)},
+    )
+    return {
+        "action": bulk_in.action,
+        "updated": len(updated_ids),
+        "tokens_revoked": len(updated_ids) if revoke else 0,
+    }
+
+# Rows fetched from the server-side cursor per round trip and written per chunk
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ("id", "username", "email", "role_name", "role_id", "is_active")
+
+# Spreadsheets run a cell starting with one of these as a formula; such text
+# cells (a username like "=HYPERLINK(...)") are written with a leading quote
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def escape_csv_cell(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def encode_csv_rows(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([escape_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+def encode_ndjson_rows(rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in rows)
+
+@router.get(
+    "/users/export",
+    summary="Экспорт пользователей",
+    description=(
+        "Выгружает пользователей в формате CSV или NDJSON (format=csv|ndjson) потоком, без ограничения на количество записей. "
+        "Поддерживает те же фильтры search, search_mode и role, что и список пользователей. "
+        "Строки читаются из серверного курсора пачками и сразу отправляются клиенту, "
+        "поэтому потребление памяти не зависит от размера выгрузки. "
+        "В CSV текстовые значения, начинающиеся с =, +, -, @, табуляции или перевода строки, предваряются апострофом, "
+        "чтобы табличные редакторы не выполняли их как формулы. "
+        "Доступно только администраторам."
+    ),
+    response_description="Файл с пользователями, упорядоченными по id.",
+    response_class=StreamingResponse,
+)
+async def export_users(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    search: str = Query(None),
+    search_mode: str = Query("substring", pattern="^(substring|fuzzy)$"),
+    role: str = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+):
+    # Plain column tuples: no ORM identity map, nothing accumulates while streaming
+    query = apply_user_filters(
+        select(User.id, User.username, User.email, Role.name, User.role_id, User.is_active).select_from(User),
+        search, role, search_mode,
+    )
+    if not role:
+        query = query.outerjoin(User.role_obj)
+    query = query.order_by(User.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    encode = encode_csv_rows if format == "csv" else encode_ndjson_rows
+    logger.info(
+        "User export (%s) by admin %s", format, current_user.id,
+        extra={"admin_id": current_user.id, "format": format, "search": search, "role": role},
+    )
+
+    async def generate():
+        # The request-scoped session from get_db stays open until the response is sent
+        if format == "csv":
+            yield encode([EXPORT_COLUMNS])
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield encode(rows)
+
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    filename = f"users-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post(
+    "/users/import",
+    response_model=UserImportReport,
+    summary="Импорт пользователей",
+    description=(
+        "Массово создаёт пользователей из CSV или NDJSON, переданных в теле запроса потоком (format=csv|ndjson). "
+        "Поля строки: username, email, password или hashed_password (готовый хеш argon2/bcrypt), role (по умолчанию user), is_active. "
+        "Пароли хешируются параллельно в отдельном пуле процессов, строки загружаются через COPY во временную таблицу "
+        "и затем одним запросом переносятся в users. При совпадении email существующий пользователь пропускается (on_conflict=skip) "
+        "или обновляется (on_conflict=update); учётная запись самого администратора не обновляется. "
+        "У обновлённых пользователей, чей пароль или признак is_active изменился, все выданные токены аннулируются. "
+        "Импорт выполняется в одной транзакции; если сбросить кэш или аннулировать токены не удаётся (Redis недоступен), "
+        "она отменяется и возвращается код 503. "
+        "Одновременно воркер выполняет только один импорт: пока он идёт, следующий сразу получает 409. "
+        "Доступно только администраторам."
+    ),
+    response_description="Итоги импорта: число добавленных, обновлённых, пропущенных и ошибочных строк, ошибки по строкам и скорость обработки."
+)
+async def import_users(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    on_conflict: str = Query("skip", pattern="^(skip|update)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_admin),
+) -> Any:
+    importer = UserImport(db, on_conflict=on_conflict, admin_id=current_user.id)
+    try:
+        report = await importer.run(request.stream(), format)
+    except ImportBusyError:
+        raise HTTPException(
+            status_code=409, detail="Another import is in progress, please try later", headers={"Retry-After": "10"},
+        )
+    except ImportFormatError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # As in bulk_update_users: before the commit, so that with Redis down no
+    # updated user keeps a stale role or status, or tokens from before a
+    # password reset or deactivation
+    revoked = set(importer.revoked_ids)
+    try:
+        await principal_cache.invalidate(*(i for i in importer.updated_ids if i not in revoked), strict=True)
+        await principal_cache.invalidate(*revoked, revoke_tokens=True)
+    except Exception:
+        await db.rollback()
+        raise HTTPException(
+            status_code=503, detail="User cache invalidation is unavailable, no users were imported",
+        )
+    await db.commit()
+
+    await replica_router.stick(current_user.id)
+    count_cache.clear()
+    logger.info(
+        "User import by admin %s: %s rows, %s inserted, %s updated, %s failed in %.1fs",
+        current_user.id, report["rows"], report["inserted"], report["updated"], report["failed"], report["seconds"],
+        extra={"admin_id": current_user.id, **{k: v for k, v in report.items() if k != "errors"}},
+    )
+    return report
@@ -2,19 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException, Response, Request
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import CTE, Select
 from typing import Any
 from jose import jwt, JWTError
 
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.redis import redis_client
+from app.core.principal_cache import principal_cache, user_from_principal
+from app.core.rate_limit import Limit, RateLimit, client_ip, form_field, global_key
+from app.core.sessions import sessions
 from app.db.session import get_db
 from app.models.user import User
 from app.models.role import Role
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
+from app.schemas.serializers import user_response
 from app.schemas.token import Token, TokenPayload
 
 router = APIRouter(
@@ -22,9 +27,28 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-async def get_role_by_name(db: AsyncSession, name: str) -> Role:
-    result = await db.execute(select(Role).where(Role.name == name))
-    return result.scalar_one_or_none()
+# Columns returned by the write statements; the password hash never leaves the DB
+USER_COLUMNS = (User.id, User.username, User.email, User.role_id, User.is_active)
+
+def select_user_with_role(written: CTE) -> Select:
+    """Selects the row of an INSERT/UPDATE ... RETURNING CTE together with its role, in the same statement."""
+    return (
+        select(written, Role.name.label("role_name"), Role.description.label("role_description"))
+        .outerjoin(Role, Role.id == written.c.role_id)
+    )
+
+def user_from_row(row: Any) -> User:
+    role = None
+    if row.role_id is not None and row.role_name is not None:
+        role = {"id": row.role_id, "name": row.role_name, "description": row.role_description}
+    return user_from_principal({
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "is_active": row.is_active,
+        "role_id": row.role_id,
+        "role": role,
+    })
 
 @router.patch(
     "/me",
@@ -39,88 +63,90 @@ async def update_user_me(
     user_in: UserUpdate,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
+    values = {}
     if user_in.email is not None and user_in.email != current_user.email:
-        result = await db.execute(select(User).where(User.email == user_in.email))
-        user = result.scalar_one_or_none()
-        if user:
-            raise HTTPException(
-                status_code=400,
-                detail="The user with this email already exists in the system.",
-            )
-        current_user.email = user_in.email
-    
+        values["email"] = user_in.email
     if user_in.username is not None:
-        current_user.username = user_in.username
-    
+        values["username"] = user_in.username
     if user_in.password is not None:
-        current_user.hashed_password = security.get_password_hash(user_in.password)
-    
-    db.add(current_user)
-    await db.commit()
-    await db.refresh(current_user)
-    
-    # Reload with role_obj
-    result = await db.execute(
-        select(User)
-        .where(User.id == current_user.id)
-        .options(selectinload(User.role_obj))
-    )
-    return result.scalar_one()
+        values["hashed_password"] = await security.get_password_hash_async(user_in.password)
+    if not values:
+        return user_response(current_user)
+
+    # One statement: UPDATE ... RETURNING joined to roles. A taken email is
+    # reported by the unique constraint instead of a SELECT beforehand.
+    updated = update(User).where(User.id == current_user.id).values(**values).returning(*USER_COLUMNS).cte("updated")
+    try:
+        row = (await db.execute(select_user_with_role(updated))).one_or_none()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await principal_cache.invalidate(current_user.id)
+    return user_response(user_from_row(row))
 
 @router.post(
     "/register",
     response_model=UserSchema,
     summary="Регистрация",
     description="Создание новой учётной записи пользователя. По умолчанию назначается роль 'user'.",
-    response_description="Данные созданного пользователя."
+    response_description="Данные созданного пользователя.",
+    dependencies=[Depends(RateLimit(
+        "register",
+        Limit.parse("ip", settings.RATE_LIMIT_REGISTER_PER_IP, client_ip),
+    ))]
 )
 async def register(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserCreate
 ) -> Any:
+    # Hashed before the insert, so a taken email costs the same time as a new one
+    hashed_password = await security.get_password_hash_async(user_in.password)
     try:
-        result = await db.execute(select(User).where(User.email == user_in.email))
-        user = result.scalar_one_or_none()
-        if user:
+        # One statement: the default role is resolved in a subquery, an existing
+        # email makes ON CONFLICT return no row, and the new user comes back
+        # together with its role
+        default_role_id = select(Role.id).where(Role.name == "user").scalar_subquery()
+        inserted = (
+            insert(User)
+            .values(
+                username=user_in.username,
+                email=user_in.email,
+                hashed_password=hashed_password,
+                is_active=True,
+                role_id=default_role_id,
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(*USER_COLUMNS)
+            .cte("inserted")
+        )
+        row = (await db.execute(select_user_with_role(inserted))).one_or_none()
+        if row is None:
+            await db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail="The user with this email already exists in the system.",
             )
-        
-        role = await get_role_by_name(db, "user")
-        
-        user = User(
-            username=user_in.username,
-            email=user_in.email,
-            hashed_password=security.get_password_hash(user_in.password),
-            is_active=True,
-            role_id=role.id if role else None
-        )
-        db.add(user)
         await db.commit()
-        
-        # Eagerly load role_obj for serialization
-        result = await db.execute(
-            select(User)
-            .where(User.id == user.id)
-            .options(selectinload(User.role_obj))
-        )
-        user = result.scalar_one()
-        return user
+        return user_response(user_from_row(row))
     except HTTPException:
         raise
     except Exception as e:
         await db.rollback()
         from app.core.logger import logger
-        logger.exception(f"Error during user registration: {e}")
+        logger.exception("Error during user registration: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal Server Error during registration: {str(e)}"
         )
 
-from fastapi_limiter.depends import RateLimiter
-
 @router.post(
     "/login",
     tags=["auth"],
@@ -131,7 +157,12 @@ from fastapi_limiter.depends import RateLimiter
         "При ошибке возвращается 401 с пояснением: неверный пароль, пользователь не найден и т.д."
     ),
     response_description="Успешная аутентификация. Токен действителен 24 часа.",
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))]
+    dependencies=[Depends(RateLimit(
+        "login",
+        Limit.parse("ip", settings.RATE_LIMIT_LOGIN_PER_IP, client_ip),
+        Limit.parse("account", settings.RATE_LIMIT_LOGIN_PER_ACCOUNT, form_field("username")),
+        Limit.parse("global", settings.RATE_LIMIT_LOGIN_GLOBAL, global_key),
+    ))]
 )
 async def login(
     request: Request,
@@ -146,17 +177,22 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        logger.warning(f"Failed login attempt for email: {form_data.username} from IP: {ip}, UA: {ua}")
+    if not user or not await security.verify_password_async(form_data.password, user.hashed_password):
+        logger.warning("Failed login attempt for email: %s from IP: %s, UA: %s", form_data.username, ip, ua)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
-        logger.warning(f"Login attempt for inactive user: {form_data.username} from IP: {ip}, UA: {ua}")
+        logger.warning("Login attempt for inactive user: %s from IP: %s, UA: %s", form_data.username, ip, ua)
         raise HTTPException(status_code=400, detail="Inactive user")
     
-    logger.info(f"Successful login for user: {user.email} from IP: {ip}, UA: {ua}")
+    logger.info("Successful login for user: %s from IP: %s, UA: %s", user.email, ip, ua)
     
-    access_token = security.create_access_token(user.id)
-    refresh_token = security.create_refresh_token(user.id)
+    try:
+        family, gen = await sessions.start(user.id)
+    except Exception:
+        # Redis is down: a session that can't be tracked can't be refreshed or revoked
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+    access_token = security.create_access_token(user.id, gen=gen)
+    refresh_token = security.create_refresh_token(user.id, family=family, gen=gen)
     
     response = JSONResponse({
         "access_token": access_token,
@@ -180,7 +216,7 @@ async def login(
     "/refresh",
     response_model=Token,
     summary="Обновить токен доступа",
-    description="Использует refresh_token из кук для получения нового access_token. Старый refresh_token аннулируется и заносится в denylist.",
+    description="Использует refresh_token из кук для получения нового access_token. Старый refresh_token становится недействительным: в сеансе (семействе токенов) действует только последний выданный токен.",
     response_description="Новый токен доступа."
 )
 async def refresh(
@@ -219,23 +255,27 @@ async def refresh(
         raise HTTPException(status_code=401, detail="Refresh token missing")
     
     try:
-        payload = jwt.decode(
-            refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_token(refresh_token)
         token_data = TokenPayload(**payload)
-        if payload.get("type") != "refresh" or not token_data.jti or not token_data.sub or not token_data.exp:
-            raise HTTPException(status_code=401, detail="Invalid token type or missing JTI/sub/exp")
+        # Tokens issued before token families have a jti instead, it acts as their family
+        family = token_data.fam or token_data.jti
+        if payload.get("type") != "refresh" or not family or not token_data.sub or not token_data.exp:
+            raise HTTPException(status_code=401, detail="Invalid token type or missing family/sub/exp")
         
-        # Check denylist in Redis
+        # Check and advance the token family in one atomic call. Only one of
+        # several parallel refreshes with the same token wins, the rest get 401.
         try:
-            is_revoked = await redis_client.exists(f"denylist:{token_data.jti}")
-            if is_revoked:
-                response = JSONResponse(status_code=401, content={"detail": "Token has been revoked"})
-                response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
-                return response
+            gen = await sessions.rotate(
+                token_data.sub, family, token_data.seq or 0, token_data.gen,
+                legacy=token_data.fam is None, issued_at=token_data.iat or 0,
+            )
         except Exception:
             # Redis is down
             raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+        if gen is None:
+            response = JSONResponse(status_code=401, content={"detail": "Token has been revoked"})
+            response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
+            return response
 
     except jwt.ExpiredSignatureError:
         response = JSONResponse(status_code=401, content={"detail": "Refresh token expired"})
@@ -259,18 +299,10 @@ async def refresh(
         response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
         return response
     
-    new_access_token = security.create_access_token(user.id)
-    new_refresh_token = security.create_refresh_token(user.id)
-    
-    # Revoke old jti in Redis
-    from datetime import datetime, timezone
-    try:
-        ttl = int(token_data.exp - datetime.now(timezone.utc).timestamp())
-        if ttl > 0:
-            await redis_client.set(f"denylist:{token_data.jti}", user.id, ex=ttl)
-    except Exception:
-        # Redis is down
-        raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+    new_access_token = security.create_access_token(user.id, gen=gen)
+    new_refresh_token = security.create_refresh_token(
+        user.id, family=family, seq=(token_data.seq or 0) + 1, gen=gen
+    )
     
     response = JSONResponse({
         "access_token": new_access_token,
@@ -290,7 +322,7 @@ async def refresh(
 @router.post(
     "/logout",
     summary="Выйти из системы",
-    description="Аннулирует текущий сеанс, удаляя refresh_token из кук и добавляя его в список отозванных (denylist) в Redis.",
+    description="Завершает текущий сеанс: удаляет refresh_token из кук и закрывает его семейство токенов в Redis, после чего refresh_token этого сеанса больше не принимается.",
     response_description="Сообщение об успешном выходе."
 )
 async def logout(
@@ -300,16 +332,12 @@ async def logout(
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
         try:
-            payload = jwt.decode(
-                refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-            )
+            payload = security.decode_token(refresh_token)
             token_data = TokenPayload(**payload)
-            if payload.get("type") == "refresh" and token_data.jti and token_data.sub and token_data.exp:
-                from datetime import datetime, timezone
+            family = token_data.fam or token_data.jti
+            if payload.get("type") == "refresh" and family and token_data.sub:
                 try:
-                    ttl = int(token_data.exp - datetime.now(timezone.utc).timestamp())
-                    if ttl > 0:
-                        await redis_client.set(f"denylist:{token_data.jti}", token_data.sub, ex=ttl)
+                    await sessions.end(token_data.sub, family, token_data.seq or 0, legacy=token_data.fam is None)
                 except Exception:
                     # Redis is down, but we continue logout (clear cookie)
                     pass
@@ -325,6 +353,34 @@ async def logout(
     )
     return {"detail": "Successfully logged out"}
 
+@router.post(
+    "/logout-all",
+    summary="Выйти на всех устройствах",
+    description=(
+        "Завершает все сеансы текущего пользователя: увеличивает счётчик поколения сеансов в Redis, "
+        "после чего все ранее выданные access- и refresh-токены пользователя, включая текущий, перестают приниматься. "
+        "Refresh_token удаляется из кук."
+    ),
+    response_description="Сообщение об успешном выходе."
+)
+async def logout_all(
+    response: Response,
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    try:
+        await principal_cache.invalidate(current_user.id, revoke_tokens=True)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+
+    response.delete_cookie(
+        key="refresh_token",
+        httponly=True,
+        secure=not settings.DEBUG,
+        samesite="strict",
+        path="/api/auth",
+    )
+    return {"detail": "Successfully logged out from all sessions"}
+
 @router.get(
     "/me",
     response_model=UserSchema,
@@ -335,4 +391,4 @@ async def logout(
 async def read_user_me(
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
-    return current_user
+    return user_response(current_user)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import deps
 from app.core.logger import logger
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.routing import get_read_db
+from app.models.user import User
 import os
-import psycopg2
 
 router = APIRouter(
     tags=["root"],
@@ -26,19 +27,37 @@ async def read_root():
 @router.get(
     "/health",
     summary="Проверка состояния",
-    description="Простой эндпоинт для проверки того, что приложение запущено и отвечает на запросы. Используется Liveness и Readiness пробами в Kubernetes.",
+    description="Простой эндпоинт для проверки того, что приложение запущено и отвечает на запросы. Зависимости не проверяет; используется Liveness пробой в Kubernetes.",
     response_description="Статус 'ok'."
 )
 async def health():
     return {"status": "ok"}
 
+@router.get(
+    "/ready",
+    summary="Готовность к приёму трафика",
+    description=(
+        "Результат последней фоновой проверки зависимостей воркера: PostgreSQL (SELECT 1 через отдельное соединение "
+        "вне пула приложения) и Redis (PING). Заполненность пула соединений с БД только сообщается в ответе "
+        "и на готовность не влияет. Проверки выполняются параллельно каждые HEALTH_CHECK_INTERVAL секунд, "
+        "у каждой свой таймаут HEALTH_CHECK_TIMEOUT. Сам запрос не обращается ни к БД, ни к Redis. "
+        "Используется Readiness пробой в Kubernetes."
+    ),
+    response_description="200 и статус 'ready', либо 503 с результатами проверок.",
+    responses={503: {"description": "Зависимость недоступна, проверка ещё не выполнялась или результат устарел."}},
+)
+async def ready():
+    from app.core.health import health_monitor
+    status_code, body = health_monitor.response()
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
 @router.get(
     "/db-check",
     summary="Проверка БД",
-    description="Проверяет соединение с базой данных PostgreSQL и возвращает версию сервера.",
+    description="Проверяет соединение с базой данных PostgreSQL и возвращает версию сервера. Запрос идёт туда же, куда и остальные запросы на чтение: на реплику, если она настроена и не отстаёт, иначе на основной сервер.",
     response_description="Статус подключения и версия БД."
 )
-async def db_check(db: AsyncSession = Depends(get_db)):
+async def db_check(db: AsyncSession = Depends(get_read_db)):
     if not settings.DATABASE_URL:
         return {"status": "error", "message": "DATABASE_URL is not set"}
     
@@ -60,7 +79,7 @@ async def db_check(db: AsyncSession = Depends(get_db)):
 )
 async def get_pod_name():
     pod_name = os.getenv("POD_NAME", "local-development")
-    logger.debug(f"Pod name requested: {pod_name}")
+    logger.debug("Pod name requested: %s", pod_name)
     return {"pod_name": pod_name}
 
 @router.get(
@@ -73,8 +92,54 @@ async def redis_check():
     from app.core.redis import redis_client
     try:
         ping = await redis_client.ping()
-        logger.debug(f"Redis ping result: {ping}")
+        logger.debug("Redis ping result: %s", ping)
         return {"status": "ok", "redis_ping": ping}
     except Exception as e:
         logger.error(f"Redis connection error: {e}")
         return {"status": "error", "message": str(e)}
+
+@router.get(
+    "/stats",
+    summary="Внутренняя статистика",
+    description="Возвращает внутреннюю статистику текущего воркера: загрузку пула хеширования паролей, глубину очереди, время хеширования, операции с сеансами (семействами refresh-токенов), попадания в кэш пользователей, заполненность очереди логов, число отброшенных записей, состояние пула соединений с БД, отставание реплики и распределение чтений между репликой и основным сервером, состояние пула Redis вместе с circuit breaker, а также длительность фаз запуска воркера (импорт, прогрев соединений, пула хеширования и схемы OpenAPI). Доступно только администраторам.",
+    response_description="Снимок статистики воркера."
+)
+async def get_stats(current_user: User = Depends(deps.get_current_active_admin)):
+    from app.core.hash_pool import hash_pool
+    from app.core.sessions import sessions
+    from app.core.principal_cache import principal_cache
+    from app.core.logger import log_stats
+    from app.db.pool import pool_stats
+    from app.db.session import engine
+    from app.db.routing import replica_router
+    from app.core.redis import redis_stats
+    from app.core.startup import startup_timings
+    return {
+        "password_hash": hash_pool.stats(),
+        "sessions": sessions.stats(),
+        "principal_cache": principal_cache.stats(),
+        "logging": log_stats(),
+        "db_pool": pool_stats(engine.pool),
+        "db_replica": replica_router.stats(),
+        "redis": redis_stats(),
+        "startup": startup_timings,
+    }
+
+@router.get(
+    "/.well-known/jwks.json",
+    summary="Открытые ключи JWT (JWKS)",
+    description=(
+        "Набор открытых ключей (RFC 7517), которыми проверяется подпись access- и refresh-токенов (ES256). "
+        "Ключ выбирается по заголовку kid токена; во время ротации в наборе присутствуют и старый, и новый ключи. "
+        "Позволяет другим сервисам проверять токены локально, без запроса к /auth/me. "
+        "Ответ можно кэшировать (Cache-Control). Пока подпись выполняется SECRET_KEY (HS256), набор пуст."
+    ),
+    response_description="JWK Set с открытыми ключами."
+)
+async def jwks():
+    from app.core.jwt_keys import key_ring
+    return Response(
+        content=key_ring.jwks_json,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE}"},
+    )
@@ -0,0 +1,90 @@
+import time
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.logger import logger
+from app.core.metrics import REDIS_CIRCUIT_OPEN, REDIS_CIRCUIT_REJECTED
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RedisConnectionError):
+    """
+    Raised instead of calling Redis while the circuit is open.
+
+    Subclasses redis ConnectionError, so every existing `except` around a Redis
+    call treats it exactly like a connection failure - only without the wait.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for a single backend.
+
+    closed    - calls go through; `failure_threshold` failures in a row open it.
+    open      - calls fail immediately with CircuitOpenError for `reset_timeout` seconds.
+    half_open - exactly one probe call is let through; success closes the circuit,
+                failure opens it again for another `reset_timeout`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self._reject()
+            self.state = HALF_OPEN
+            logger.info("Circuit %s half-open, probing", self.name)
+        if self._probe_in_flight:
+            self._reject()
+        self._probe_in_flight = True
+
+    def _reject(self) -> None:
+        self.rejected += 1
+        REDIS_CIRCUIT_REJECTED.inc()
+        raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            self.state = CLOSED
+            REDIS_CIRCUIT_OPEN.set(0)
+            logger.info("Circuit %s closed", self.name)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+                logger.warning("Circuit %s opened after %s failures", self.name, self._failures)
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            REDIS_CIRCUIT_OPEN.set(1)
+
+    def release(self) -> None:
+        # The call ended without telling anything about the backend (cancelled),
+        # let the next call probe instead
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -14,13 +14,87 @@ class Settings(BaseSettings):
     DB_SSL_MODE: str = "disable"
     DB_SSL_ROOT_CERT: str | None = "/root/.postgresql/root.crt"
 
+    # Connection pool. By default pool_size/max_overflow are derived from the
+    # server limit so that all workers of all pods fit into it.
+    DB_ECHO: bool = False
+    DB_MAX_CONNECTIONS: int = 100       # max_connections of the Postgres server
+    DB_RESERVED_CONNECTIONS: int = 10   # left for migrations, admin tools, superuser
+    DB_APP_INSTANCES: int = 3           # pods running at once, incl. rolling-deploy surge
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: float = 5.0
+    DB_COMMAND_TIMEOUT: float | None = 30.0
+
+    # Read replica (hot standby) for endpoints that only read; unset sends
+    # everything to the primary. Same user, password and database as the primary.
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int | None = None
+    # Reads fall back to the primary while the replica is further behind than
+    # this, or while its lag is unknown (check failing or older than 3 intervals,
+    # WAL receiver not streaming). The lag check reads pg_stat_wal_receiver:
+    # DB_USER needs pg_monitor (or pg_read_all_stats) on the replica.
+    DB_REPLICA_MAX_LAG: float = 2.0
+    DB_REPLICA_CHECK_INTERVAL: float = 1.0
+    # After a write, that user's reads go to the primary for this long (read
+    # your writes); must exceed DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL
+    DB_REPLICA_STICKY_SECONDS: float = 5.0
+
+    # Gunicorn workers per pod; unset sizes them from the container's CPU
+    # limit (app/core/runtime.py): WEB_WORKERS_PER_CPU each, at most WEB_MAX_WORKERS
+    WEB_CONCURRENCY: int | None = None
+    WEB_WORKERS_PER_CPU: float = 1.0
+    WEB_MAX_WORKERS: int = 8
+
+    # Gunicorn runtime (gunicorn.conf.py)
+    GUNICORN_BIND: str = "0.0.0.0:8000"
+    # A worker is replaced after this many requests (plus up to the jitter,
+    # so the workers don't all restart at once); 0 disables
+    GUNICORN_MAX_REQUESTS: int = 20000
+    GUNICORN_MAX_REQUESTS_JITTER: int = 2000
+    # Longer than the ingress upstream keep-alive (nginx: 60s), so the proxy
+    # closes idle connections first and never reuses one we just dropped
+    GUNICORN_KEEPALIVE: int = 75
+    # A worker that doesn't report to the master for this long is restarted
+    GUNICORN_TIMEOUT: int = 60
+    # Time to finish in-flight requests after SIGTERM; keep it below
+    # terminationGracePeriodSeconds minus the preStop sleep
+    GUNICORN_GRACEFUL_TIMEOUT: int = 20
+    GUNICORN_PRELOAD_APP: bool = False
+    # Prometheus metrics of all workers, served by the gunicorn master on a
+    # port of its own that neither the Service nor the ingress routes; 0 disables
+    METRICS_PORT: int = 9100
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
     ALGORITHM: str = "HS256"
+    # ES256 signing keys, see app.core.jwt_keys. Without them tokens are signed with SECRET_KEY.
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    # Keep accepting SECRET_KEY-signed tokens after the switch to ES256 (until they expire)
+    JWT_ACCEPT_HS256: bool = True
+    JWKS_CACHE_MAX_AGE: int = 300
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    # Password hashing pool ("thread" or "process")
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+
+    # Admin bulk user import: separate hashing pool, so an import never starves logins
+    IMPORT_HASH_EXECUTOR: str = "process"
+    IMPORT_HASH_WORKERS: int = 4
+    # Rows hashed and copied into the staging table per batch
+    IMPORT_BATCH_SIZE: int = 1000
+    # Longest CSV record (characters) a quoted field may span before its row fails
+    IMPORT_MAX_RECORD_SIZE: int = 65536
+    # Per-row errors returned in the report (the total is always counted)
+    IMPORT_MAX_ERRORS: int = 1000
     
     # Redis settings
     REDIS_HOST: str = "localhost"
@@ -30,6 +104,58 @@ class Settings(BaseSettings):
     REDIS_SSL: bool = False
     REDIS_CONNECT_TIMEOUT: float = 1.0
     REDIS_READ_TIMEOUT: float = 1.0
+    # Per worker; one connection is held by the pub/sub subscriber
+    REDIS_MAX_CONNECTIONS: int = 32
+    # How long a command waits for a free connection before failing
+    REDIS_POOL_TIMEOUT: float = 0.2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    REDIS_CIRCUIT_RESET_TIMEOUT: float = 5.0
+    # What to do when Redis is unavailable: True lets the request through
+    # without the session generation check, False answers 503. Refresh token
+    # rotation always fails closed.
+    DENYLIST_FAIL_OPEN: bool = False
+    RATE_LIMIT_FAIL_OPEN: bool = True
+
+    # Rate limits as "times/seconds"
+    RATE_LIMIT_LOGIN_PER_IP: str = "5/60"
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "10/900"
+    RATE_LIMIT_LOGIN_GLOBAL: str = "6000/60"
+    RATE_LIMIT_REGISTER_PER_IP: str = "10/3600"
+    # Local token buckets kept per worker
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 100000
+
+    # Authenticated principal cache (per-worker LRU in front of Redis)
+    PRINCIPAL_CACHE_LOCAL_SIZE: int = 10000
+    PRINCIPAL_CACHE_LOCAL_TTL: float = 10.0
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300
+
+    # How long an exact admin user count is reused for the same filters
+    ADMIN_COUNT_CACHE_TTL: float = 15.0
+    # Most users a filtered bulk update may change (a list of ids is capped by the schema)
+    ADMIN_BULK_MAX_ROWS: int = 10000
+
+    # Warm-up in the lifespan hook before the worker takes traffic: pooled
+    # connections opened up front (capped by the pool sizes, 0 disables)
+    STARTUP_DB_CONNECTIONS: int = 2
+    STARTUP_REDIS_CONNECTIONS: int = 2
+    STARTUP_WARM_HASH_POOL: bool = True
+    # Per phase; a failed or slow phase is logged and startup goes on
+    STARTUP_WARMUP_TIMEOUT: float = 10.0
+
+    # Background readiness checks behind /api/ready
+    HEALTH_CHECK_INTERVAL: float = 2.0
+    # Deadline of every single check; checks run concurrently
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    # A result older than this (the checker is stuck) is reported as not ready
+    HEALTH_CHECK_STALE_AFTER: float = 10.0
+
+    # Served over plain HTTP even when DEBUG is off (kubelet probes bypass the ingress)
+    HTTPS_EXEMPT_PATHS: list[str] = ["/api/health", "/api/ready"]
+
+    # Successful requests to these paths are logged only with the given probability
+    LOG_PROBE_PATHS: list[str] = ["/api/health", "/api/ready"]
+    LOG_PROBE_SAMPLE_RATE: float = 0.0
 
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import (
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_QUEUE_DEPTH,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_WAIT,
+)
+
+
+class HashPoolFullError(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    # Runs inside the worker (thread or process), so the measured time is
+    # the pure hashing cost without the time spent waiting in the queue.
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class HashPool:
+    """
+    Bounded executor for CPU-heavy password hashing.
+
+    At most `workers` hashes run at the same time and at most `max_queue`
+    more wait for a free worker. Anything above that is rejected right away
+    with HashPoolFullError instead of piling up behind the event loop.
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so that every gunicorn worker gets its own pool after fork
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            logger.info(f"Password hash pool started: {self.kind} x {self.workers}")
+        return self._executor
+
+    def _release(self, _future: asyncio.Future) -> None:
+        self._in_flight -= 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(self.queue_depth)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc()
+            raise HashPoolFullError()
+
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        PASSWORD_HASH_QUEUE_DEPTH.set(self.queue_depth)
+        submitted = time.perf_counter()
+        future = loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        # The slot is released only when the hash actually finishes, even if the
+        # request waiting for it was cancelled (client disconnect, timeout).
+        future.add_done_callback(self._release)
+
+        result, hash_seconds = await asyncio.shield(future)
+
+        wait_seconds = max(0.0, time.perf_counter() - submitted - hash_seconds)
+        self.completed += 1
+        self.hash_seconds_total += hash_seconds
+        self.hash_seconds_max = max(self.hash_seconds_max, hash_seconds)
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        PASSWORD_HASH_DURATION.labels(operation=getattr(fn, "__name__", "unknown")).observe(hash_seconds)
+        PASSWORD_HASH_WAIT.observe(wait_seconds)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_avg": self.hash_seconds_total / self.completed if self.completed else 0.0,
+            "hash_seconds_max": self.hash_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / self.completed if self.completed else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    async def warm_up(self, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Starts the workers and runs `fn` once in each, so the first requests
+        don't pay for spawning processes and importing the hashing code.
+        Not counted in the stats.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, fn, *args) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hash_pool = HashPool(
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+# Bulk imports hash thousands of passwords at once; with their own pool they
+# can't fill the queue that interactive logins depend on
+import_hash_pool = HashPool(
+    kind=settings.IMPORT_HASH_EXECUTOR,
+    workers=settings.IMPORT_HASH_WORKERS,
+    max_queue=0,
+)
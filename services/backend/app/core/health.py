@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+import orjson
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import DEPENDENCY_CHECK_DURATION, DEPENDENCY_UP
+
+
+class HealthMonitor:
+    """
+    Readiness of this worker, computed in the background.
+
+    Every HEALTH_CHECK_INTERVAL seconds the dependency checks run concurrently,
+    each cut off after HEALTH_CHECK_TIMEOUT, and the outcome is stored as a
+    ready-to-send (status code, body) pair. /api/ready only returns that pair,
+    so a probe costs no DB connection and no Redis round trip, however often
+    Kubernetes sends it. A result older than HEALTH_CHECK_STALE_AFTER (the
+    checker itself is stuck) counts as not ready.
+    """
+
+    def __init__(self):
+        self._checks: dict[str, Callable[[], Awaitable[dict[str, Any]]]] = {}
+        self._task: asyncio.Task | None = None
+        self._response = self._render(False, {}, "starting")
+        self._checked_at = 0.0
+        self.runs = 0
+
+    def register(self, name: str, check: Callable[[], Awaitable[dict[str, Any]]]) -> None:
+        """check() returns details for the response and raises if the dependency is not usable."""
+        self._checks[name] = check
+
+    @staticmethod
+    def _render(ready: bool, checks: dict[str, Any], status: str | None = None) -> tuple[int, bytes]:
+        body = {"status": status or ("ready" if ready else "not_ready"), "checks": checks}
+        return (200 if ready else 503), orjson.dumps(body)
+
+    async def _run_check(self, name: str, check) -> dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(check(), timeout=settings.HEALTH_CHECK_TIMEOUT)
+            result = {"ok": True, **details}
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": f"timed out after {settings.HEALTH_CHECK_TIMEOUT}s"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        seconds = time.perf_counter() - start
+        result["latency_ms"] = round(seconds * 1000, 2)
+        DEPENDENCY_CHECK_DURATION.labels(check=name).observe(seconds)
+        DEPENDENCY_UP.labels(check=name).set(int(result["ok"]))
+        return result
+
+    async def check(self) -> tuple[int, bytes]:
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._run_check(name, self._checks[name]) for name in names))
+        checks = dict(zip(names, results))
+        ready = all(result["ok"] for result in results)
+        if not ready and self._response[0] == 200:
+            failed = [name for name, result in checks.items() if not result["ok"]]
+            logger.warning(f"Readiness lost, failing checks: {', '.join(failed)}")
+        elif ready and self._response[0] != 200 and self.runs:
+            logger.info("Readiness restored")
+        self._response = self._render(ready, checks)
+        self._checked_at = time.monotonic()
+        self.runs += 1
+        return self._response
+
+    def response(self) -> tuple[int, bytes]:
+        """The last result as (status code, JSON body); a dict lookup, no IO."""
+        if self._checked_at and time.monotonic() - self._checked_at > settings.HEALTH_CHECK_STALE_AFTER:
+            return self._render(False, {}, "stale")
+        return self._response
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL)
+
+
+async def check_database() -> dict[str, Any]:
+    # On a connection of its own, not one from the application pool
+    from app.db.session import health_engine
+    async with health_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return {}
+
+
+async def check_redis() -> dict[str, Any]:
+    # Goes through the circuit breaker: while it is open this fails at once
+    from app.core.redis import redis_client
+    await redis_client.ping()
+    return {}
+
+
+async def check_db_pool() -> dict[str, Any]:
+    # Reported, never failing: a full pool is peak load, and taking the worker
+    # out of rotation would only push that load onto the others until they fail too
+    from app.db.session import engine
+    pool = engine.pool
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+    saturation = pool.checkedout() / capacity if capacity else 0.0
+    return {"saturation": round(saturation, 3)}
+
+
+health_monitor = HealthMonitor()
+health_monitor.register("db_pool", check_db_pool)
+health_monitor.register("db", check_database)
+health_monitor.register("redis", check_redis)
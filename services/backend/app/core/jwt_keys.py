@@ -0,0 +1,113 @@
+"""
+Token signing keys.
+
+With JWT_KEYS_DIR set, tokens are signed with ES256. Every `<kid>.pem` file in
+the directory is a key, the file name without extension is its `kid`:
+
+    openssl ecparam -name prime256v1 -genkey -noout | openssl pkcs8 -topk8 -nocrypt -out 2026-10.pem
+
+JWT_ACTIVE_KID selects the private key that signs; all keys in the directory
+(private, or public-only for keys that are being retired) verify and are
+published at /api/.well-known/jwks.json, so other services can check tokens
+locally. Rotation without invalidating sessions:
+
+  1. add the new key file and deploy - every pod can now verify it;
+  2. switch JWT_ACTIVE_KID to it and deploy - new tokens carry the new kid;
+  3. remove the old key once REFRESH_TOKEN_EXPIRE_DAYS have passed.
+
+Without JWT_KEYS_DIR tokens keep being signed with SECRET_KEY (ALGORITHM, HS256).
+While JWT_ACCEPT_HS256 is on, such tokens issued before the switch stay valid.
+"""
+import json
+from pathlib import Path
+from typing import Any
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+
+from app.core.config import settings
+
+ES256 = "ES256"
+
+
+def load_keys(directory: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Reads `<kid>.pem` files: returns (private keys, public keys) by kid."""
+    private_keys: dict[str, Any] = {}
+    public_keys: dict[str, Any] = {}
+    for path in sorted(Path(directory).glob("*.pem")):
+        data = path.read_bytes()
+        try:
+            key = serialization.load_pem_private_key(data, password=None)
+            private_keys[path.stem] = key
+            public = key.public_key()
+        except ValueError:
+            public = serialization.load_pem_public_key(data)
+        if not isinstance(public, ec.EllipticCurvePublicKey) or not isinstance(public.curve, ec.SECP256R1):
+            raise ValueError(f"JWT key {path.name} is not a P-256 (ES256) key")
+        public_keys[path.stem] = public
+    return private_keys, public_keys
+
+
+class KeyRing:
+    """Signing key and verification keys of this process, built once at import."""
+
+    def __init__(
+        self,
+        private_keys: dict[str, Any],
+        public_keys: dict[str, Any],
+        active_kid: str | None,
+        secret: str,
+        secret_algorithm: str,
+        accept_hs256: bool,
+    ):
+        if public_keys and active_kid not in private_keys:
+            raise ValueError(f"JWT_ACTIVE_KID {active_kid!r} has no private key in JWT_KEYS_DIR")
+        self.active_kid = active_kid if public_keys else None
+        self._signing_key = private_keys.get(active_kid) if public_keys else None
+        # jose key objects: the PEM is not parsed again on every request
+        self._verify_keys = {kid: jwk.construct(key, ES256) for kid, key in public_keys.items()}
+        self._secret = secret
+        self._secret_algorithm = secret_algorithm
+        # Before the switch to ES256 HS256 is the only algorithm, afterwards only if allowed
+        self._accept_hs256 = accept_hs256 or not public_keys
+        self.jwks = {
+            "keys": [
+                {**key.to_dict(), "kid": kid, "use": "sig"} for kid, key in self._verify_keys.items()
+            ]
+        }
+        self.jwks_json = json.dumps(self.jwks).encode()
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        private_keys, public_keys = load_keys(settings.JWT_KEYS_DIR) if settings.JWT_KEYS_DIR else ({}, {})
+        return cls(
+            private_keys,
+            public_keys,
+            active_kid=settings.JWT_ACTIVE_KID,
+            secret=settings.SECRET_KEY,
+            secret_algorithm=settings.ALGORITHM,
+            accept_hs256=settings.JWT_ACCEPT_HS256,
+        )
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        if self._signing_key is None:
+            return jwt.encode(claims, self._secret, algorithm=self._secret_algorithm)
+        return jwt.encode(claims, self._signing_key, algorithm=ES256, headers={"kid": self.active_kid})
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Verifies the signature with the key named by the token header and returns the claims."""
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == ES256:
+            key = self._verify_keys.get(header.get("kid"))
+            if key is None:
+                raise JWTError("Unknown signing key")
+            return jwt.decode(token, key, algorithms=[ES256])
+        if algorithm == self._secret_algorithm and self._accept_hs256:
+            return jwt.decode(token, self._secret, algorithms=[algorithm])
+        raise JWTError("Signing algorithm not allowed")
+
+
+key_ring = KeyRing.from_settings()
@@ -1,23 +1,122 @@
+import atexit
+import json
 import logging
-import sys
+import logging.handlers
 import os
+import queue
+import sys
 
 # Настраиваем логгер приложения
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" для продакшена (одна JSON-строка на запись) или "text" для локальной отладки
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Максимум записей, ожидающих вывода; при переполнении новые записи отбрасываются
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed via `extra=` become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records over to the listener thread without ever blocking the caller.
+
+    Messages are not formatted here: the record keeps its msg/args and is
+    rendered by the listener, off the request path. When the queue is full the
+    record is dropped and counted instead of stalling the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        handler.setFormatter(
+            logging.Formatter(
+                fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                datefmt=DATE_FORMAT
+            )
+        )
+    else:
+        handler.setFormatter(JsonFormatter())
+    return handler
+
 
 logger = logging.getLogger("app")
 logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
 
+listener: logging.handlers.QueueListener | None = None
+
+
+def start_listener() -> None:
+    """
+    Starts this process's listener thread on a fresh queue.
+
+    Threads don't survive fork(): a child of a process that already logged
+    (gunicorn workers with preload_app) must call this, otherwise its records
+    pile up in the inherited queue and are never written.
+    """
+    global listener
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    for handler in logger.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = log_queue
+    # stdout is written only from the listener thread
+    listener = logging.handlers.QueueListener(log_queue, _build_stream_handler(), respect_handler_level=True)
+    listener.start()
+
+
 # Если обработчиков еще нет, добавляем их
 if not logger.handlers:
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(
-        logging.Formatter(
-            fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-    )
-    logger.addHandler(handler)
+    logger.addHandler(DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE)))
+    start_listener()
+    atexit.register(lambda: listener.stop())
 
-logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
+def log_stats() -> dict:
+    for handler in logger.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            return {
+                "format": LOG_FORMAT,
+                "queued": handler.queue.qsize(),
+                "capacity": handler.queue.maxsize,
+                "dropped": handler.dropped,
+            }
+    return {"format": LOG_FORMAT}
+
+
+logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
@@ -0,0 +1,118 @@
+import os
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Set by entrypoint.sh. With several gunicorn workers every process writes its
+# samples to this directory; the gunicorn master merges them and serves the
+# numbers of the whole pod on METRICS_PORT (gunicorn.conf.py). The master must
+# not import this module: the metrics declared here would get samples of its
+# own, and its 0 would hide the -1 of an unknown replica lag (livemax).
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# HTTP
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    multiprocess_mode="livesum",
+)
+
+# Database pool
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the SQLAlchemy pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened above pool_size.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts that failed because the pool stayed exhausted for pool_timeout.",
+)
+
+# Read replica routing (app.db.routing)
+DB_READS_ROUTED = Counter(
+    "db_reads_routed",
+    "Read-only sessions by the database they were sent to and why.",
+    ["target", "reason"],
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag measured by the worker, -1 while unknown.",
+    multiprocess_mode="livemax",
+)
+
+# Redis
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip time by command (PIPELINE for pipelines).",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+REDIS_CIRCUIT_OPEN = Gauge(
+    "redis_circuit_open",
+    "1 while the Redis circuit breaker is open or half-open.",
+    multiprocess_mode="livemax",
+)
+REDIS_CIRCUIT_REJECTED = Counter(
+    "redis_circuit_rejected",
+    "Redis calls failed fast because the circuit was open.",
+)
+
+# Password hashing
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password in the worker pool.",
+    ["operation"],
+    buckets=HASH_BUCKETS,
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a hashing job waited for a free worker.",
+    buckets=HASH_BUCKETS,
+)
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Hashing jobs waiting for a free worker.",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected",
+    "Hashing jobs rejected with 503 because the pool was full.",
+)
+
+# Rate limiting
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections",
+    "Requests rejected by the rate limiter, by layer (local token bucket or Redis window).",
+    ["route", "layer"],
+)
+
+# Readiness checks (app.core.health)
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "1 if the last readiness check of the dependency passed; the pod value is the worst worker.",
+    ["check"],
+    multiprocess_mode="livemin",
+)
+DEPENDENCY_CHECK_DURATION = Histogram(
+    "dependency_check_duration_seconds",
+    "Duration of the background readiness checks.",
+    ["check"],
+    buckets=FAST_BUCKETS,
+)
@@ -0,0 +1,177 @@
+import json
+from typing import Any
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.pubsub import invalidation_subscriber
+from app.core.redis import redis_client
+from app.core.sessions import GENERATION_FIELD, SESSION_PREFIX, SESSION_TTL_SECONDS
+from app.models.role import Role
+from app.models.user import User
+
+PRINCIPAL_PREFIX = "principal:"
+PRINCIPAL_CHANNEL = "principal:invalidate"
+
+# Written on invalidation instead of a plain DEL, so that a request which read
+# the old row just before the write cannot put it back into Redis (SET NX fails).
+TOMBSTONE = "-"
+TOMBSTONE_TTL_SECONDS = 5
+
+
+def principal_from_user(user: User, gen: int = 0) -> dict[str, Any]:
+    """Cache record of a user; `gen` is the user's current session generation."""
+    role = user.role_obj
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_active": user.is_active,
+        "role_id": user.role_id,
+        "role": {"id": role.id, "name": role.name, "description": role.description} if role else None,
+        "gen": gen,
+    }
+
+
+def user_from_principal(record: dict[str, Any]) -> User:
+    """
+    Rebuild a detached User (with its role) from a cached record.
+
+    The instance behaves like one loaded from the DB and later detached: it can be
+    attached to a session with `db.add()` and updated. Columns that are not part
+    of the record (hashed_password) are expired and must not be read from it.
+    """
+    role = None
+    if record["role"]:
+        role = Role(**record["role"])
+        make_transient_to_detached(role)
+    user = User(
+        id=record["id"],
+        username=record["username"],
+        email=record["email"],
+        is_active=record["is_active"],
+        role_id=record["role_id"],
+        role_obj=role,
+    )
+    make_transient_to_detached(user)
+    return user
+
+
+class PrincipalCache:
+    """
+    Two-tier cache of the authenticated principal, keyed by user id.
+
+    Tier 1 is a per-worker LRU with a short TTL, tier 2 is Redis. Writes call
+    invalidate(), which replaces the Redis entry with a tombstone and publishes
+    the ids on PRINCIPAL_CHANNEL so every worker drops its local copy. The local
+    tier is only used while the pub/sub connection is up.
+    Redis errors are never fatal here: the caller just falls back to the DB.
+    """
+
+    def __init__(self, local_size: int, local_ttl: float, redis_ttl: int):
+        self.local = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.ready = False
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    async def get(self, user_id: int) -> dict[str, Any] | None:
+        if self.ready:
+            record = self.local.get(user_id)
+            if record is not None:
+                return record
+        try:
+            raw = await redis_client.get(f"{PRINCIPAL_PREFIX}{user_id}")
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None
+        if not raw or raw == TOMBSTONE:
+            self.redis_misses += 1
+            return None
+        record = json.loads(raw)
+        if "gen" not in record:
+            # Written before records carried the session generation
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        if self.ready:
+            self.local.set(user_id, record)
+        return record
+
+    async def set(self, record: dict[str, Any]) -> None:
+        # The local tier is filled only when Redis accepted the record: a lost
+        # SET NX means a tombstone (the row changed after it was read) or a
+        # newer record, and a failed write means the tombstone may be missed.
+        try:
+            written = await redis_client.set(
+                f"{PRINCIPAL_PREFIX}{record['id']}", json.dumps(record), ex=self.redis_ttl, nx=True
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {e}")
+            return
+        if written and self.ready:
+            self.local.set(record["id"], record)
+
+    async def invalidate(self, *user_ids: int, revoke_tokens: bool = False, strict: bool = False) -> None:
+        """
+        Drops the users from every tier. With revoke_tokens, the same pipeline
+        also bumps their session generation, which revokes every access and
+        refresh token issued so far. Redis errors are raised with revoke_tokens
+        or strict (changes a stale principal must not outlive, like a lost
+        admin role), logged otherwise.
+        """
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self.local.pop(user_id)
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for user_id in user_ids:
+                    pipe.set(f"{PRINCIPAL_PREFIX}{user_id}", TOMBSTONE, ex=TOMBSTONE_TTL_SECONDS)
+                    if revoke_tokens:
+                        pipe.hincrby(f"{SESSION_PREFIX}{user_id}", GENERATION_FIELD, 1)
+                        pipe.expire(f"{SESSION_PREFIX}{user_id}", SESSION_TTL_SECONDS)
+                pipe.publish(PRINCIPAL_CHANNEL, ",".join(str(user_id) for user_id in user_ids))
+                await pipe.execute()
+        except Exception as e:
+            # Other workers will pick up the change once their local TTL runs out
+            logger.error(f"Principal cache invalidation failed for {user_ids}: {e}")
+            if revoke_tokens or strict:
+                raise
+
+    def _on_message(self, data: str) -> None:
+        for user_id in data.split(","):
+            self.local.pop(int(user_id))
+
+    async def _on_connect(self) -> None:
+        self.local.clear()
+        self.ready = True
+
+    def _on_disconnect(self) -> None:
+        self.ready = False
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "local_size": len(self.local),
+            "local_hits": self.local.hits,
+            "local_misses": self.local.misses,
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    local_size=settings.PRINCIPAL_CACHE_LOCAL_SIZE,
+    local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL,
+)
+invalidation_subscriber.register(
+    PRINCIPAL_CHANNEL,
+    principal_cache._on_message,
+    on_connect=principal_cache._on_connect,
+    on_disconnect=principal_cache._on_disconnect,
+)
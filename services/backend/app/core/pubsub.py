@@ -0,0 +1,115 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from app.core.logger import logger
+from app.core.redis import redis_client
+
+
+class InvalidationSubscriber:
+    """
+    One Redis pub/sub connection per worker that fans out invalidation
+    messages to process-local caches.
+
+    Every consumer registers a channel (several may share one) with three callbacks:
+      * handler(data)  - called for every message on the channel;
+      * on_connect()   - awaited after (re)subscribing, used to rebuild the cache
+                         from Redis so nothing published while we were away is lost;
+      * on_disconnect() - called as soon as the connection drops, so the cache
+                         stops answering from memory until it has been rebuilt.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+        self._on_connect: list[Callable[[], Awaitable[None]]] = []
+        self._on_disconnect: list[Callable[[], None]] = []
+        self._task: asyncio.Task | None = None
+        self._reconnected = False
+        self._stopping = False
+        self.connected = False
+
+    def register(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        on_connect: Callable[[], Awaitable[None]] | None = None,
+        on_disconnect: Callable[[], None] | None = None,
+    ) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+        if on_connect:
+            self._on_connect.append(on_connect)
+        if on_disconnect:
+            self._on_disconnect.append(on_disconnect)
+
+    async def start(self) -> None:
+        if self._task is None and self._handlers:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="invalidation-subscriber")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # The read timeout inside get_message() can swallow a cancellation,
+            # so the loop also checks this flag between polls.
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._mark_disconnected()
+
+    def _mark_disconnected(self) -> None:
+        self.connected = False
+        for callback in self._on_disconnect:
+            callback()
+
+    async def _on_reconnect(self, connection) -> None:
+        # redis-py silently reconnects and resubscribes on its own; messages sent
+        # in between are lost, so caches must be rebuilt before being trusted again.
+        self._reconnected = True
+        self._mark_disconnected()
+
+    async def _resync(self) -> None:
+        for callback in self._on_connect:
+            await callback()
+        self.connected = True
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while not self._stopping:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self._handlers)
+                pubsub.connection.register_connect_callback(self._on_reconnect)
+                await self._resync()
+                logger.info(f"Subscribed to invalidation channels: {', '.join(self._handlers)}")
+                backoff = 0.5
+
+                while not self._stopping:
+                    if self._reconnected:
+                        self._reconnected = False
+                        await self._resync()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    for handler in self._handlers.get(message["channel"], ()):
+                        try:
+                            handler(message["data"])
+                        except Exception as e:
+                            logger.error(f"Invalid message on {message['channel']}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._mark_disconnected()
+                logger.warning(f"Invalidation subscriber lost Redis connection: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+invalidation_subscriber = InvalidationSubscriber(redis_client)
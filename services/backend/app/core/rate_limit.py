@@ -0,0 +1,183 @@
+import hashlib
+import itertools
+import os
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import ceil
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import RATE_LIMIT_REJECTIONS
+from app.core.redis import redis_client
+
+RATE_LIMIT_PREFIX = "ratelimit:"
+
+# Sliding window over a sorted set per key, all keys of a route checked and
+# recorded in one atomic call. Nothing is recorded if any key is over its limit.
+# KEYS - one per limit; ARGV - member, then window_ms and limit for every key.
+# Returns 0 if allowed, otherwise milliseconds until the oldest blocking hit leaves the window.
+SLIDING_WINDOW_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[i * 2])
+    local limit = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[i * 2])
+end
+return 0
+"""
+
+KeyFunc = Callable[[Request], Awaitable[str | None]]
+
+
+async def client_ip(request: Request) -> str:
+    # The ingress overwrites X-Forwarded-For with the real peer address
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def form_field(name: str) -> KeyFunc:
+    """Key by a submitted form field (e.g. the login email); hashed so no PII ends up in Redis."""
+    async def key(request: Request) -> str | None:
+        value = (await request.form()).get(name)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+    return key
+
+
+async def global_key(request: Request) -> str:
+    return "all"
+
+
+@dataclass(frozen=True)
+class Limit:
+    scope: str
+    times: int
+    seconds: float
+    key: KeyFunc
+
+    @classmethod
+    def parse(cls, scope: str, spec: str, key: KeyFunc) -> "Limit":
+        """Builds a limit from a "times/seconds" string, e.g. "5/60"."""
+        times, seconds = spec.split("/")
+        return cls(scope=scope, times=int(times), seconds=float(seconds), key=key)
+
+
+class TokenBuckets:
+    """
+    Per-worker token buckets, one per rate limit key.
+
+    Each bucket holds up to `times` tokens and refills at times/seconds per
+    second, so a single worker never lets through more than the limit itself.
+    Least recently used buckets are evicted above `maxsize`, which only makes
+    the local layer more lenient - Redis still enforces the real limit.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def _tokens(self, key: str, limit: Limit, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (float(limit.times), now))
+        return min(float(limit.times), tokens + (now - updated) * limit.times / limit.seconds)
+
+    def retry_after(self, key: str, limit: Limit, now: float) -> float:
+        """Seconds until the bucket has a token again, 0 if it has one now."""
+        tokens = self._tokens(key, limit, now)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) * limit.seconds / limit.times
+
+    def take(self, key: str, limit: Limit, now: float) -> None:
+        self._buckets[key] = (self._tokens(key, limit, now) - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+local_buckets = TokenBuckets(maxsize=settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+_sliding_window = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+# Unique sorted set members across pods and workers without a random call per request
+_HOSTNAME = socket.gethostname()
+_member_ids = itertools.count()
+
+
+class RateLimit:
+    """
+    Route dependency enforcing several limits (per IP, per account, global) at once.
+
+    A request is first checked against the local token buckets: bursts that are
+    over the limit already in this worker are rejected in memory, without a
+    Redis round trip and before the handler gets to Argon2. Whatever passes is
+    checked against the shared Redis sliding window, one script call for all
+    limits of the route. Rejections answer 429 with Retry-After.
+
+        @router.post("/login", dependencies=[Depends(RateLimit("login", Limit.parse("ip", "5/60", client_ip)))])
+    """
+
+    def __init__(self, name: str, *limits: Limit):
+        self.name = name
+        self.limits = limits
+
+    async def __call__(self, request: Request) -> None:
+        keyed: list[tuple[str, Limit]] = []
+        for limit in self.limits:
+            value = await limit.key(request)
+            if value is not None:
+                keyed.append((f"{RATE_LIMIT_PREFIX}{self.name}:{limit.scope}:{value}", limit))
+        if not keyed:
+            return
+
+        now = time.monotonic()
+        retry_after = max(local_buckets.retry_after(key, limit, now) for key, limit in keyed)
+        if retry_after > 0:
+            self._reject("local", retry_after)
+        for key, limit in keyed:
+            local_buckets.take(key, limit, now)
+
+        args: list = [f"{_HOSTNAME}:{os.getpid()}:{next(_member_ids)}"]
+        for _, limit in keyed:
+            args += [int(limit.seconds * 1000), limit.times]
+        try:
+            retry_ms = await _sliding_window(keys=[key for key, _ in keyed], args=args)
+        except Exception as e:
+            if not settings.RATE_LIMIT_FAIL_OPEN:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Service temporarily unavailable, please try later"
+                )
+            logger.warning("Rate limit %s checked locally only, Redis unavailable: %s", self.name, e)
+            return
+        if retry_ms:
+            self._reject("redis", int(retry_ms) / 1000)
+
+    def _reject(self, layer: str, retry_after: float) -> None:
+        RATE_LIMIT_REJECTIONS.labels(route=self.name, layer=layer).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too Many Requests",
+            headers={"Retry-After": str(max(1, ceil(retry_after)))},
+        )
@@ -1,14 +1,120 @@
+import time
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError, TimeoutError as RedisTimeoutError
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
+from app.core.metrics import REDIS_COMMAND_DURATION
 
-redis_client = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    db=settings.REDIS_DB,
-    password=settings.REDIS_PASSWORD,
-    ssl=settings.REDIS_SSL,
-    ssl_cert_reqs=None, # For managed services we often don't verify certs if it's internal or we don't have CA
-    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
-    socket_timeout=settings.REDIS_READ_TIMEOUT,
-    decode_responses=True,
+# Errors that say "Redis is unreachable or too slow". Anything else (NOSCRIPT,
+# WRONGTYPE...) means Redis answered and doesn't count against the circuit.
+REDIS_FAILURES = (RedisConnectionError, RedisTimeoutError, OSError)
+# Raised by BlockingConnectionPool after REDIS_POOL_TIMEOUT when every
+# connection of this worker is busy: says nothing about Redis itself
+POOL_EXHAUSTED_MESSAGE = "No connection available."
+
+
+def _pool_exhausted(error: BaseException) -> bool:
+    return isinstance(error, RedisConnectionError) and str(error) == POOL_EXHAUSTED_MESSAGE
+
+
+async def _guarded(breaker: CircuitBreaker, call, *args, **kwargs):
+    breaker.before_call()
+    try:
+        result = await call(*args, **kwargs)
+    except REDIS_FAILURES as e:
+        if _pool_exhausted(e):
+            # Opening the circuit here would turn a local overload into an outage
+            breaker.release()
+        else:
+            breaker.record_failure()
+        raise
+    except RedisError:
+        breaker.record_success()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success()
+    return result
+
+
+class InstrumentedPipeline(Pipeline):
+    breaker: CircuitBreaker
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await _guarded(self.breaker, super().execute, raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels(command="PIPELINE").observe(time.perf_counter() - start)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    redis.Redis that records the round-trip time of every command and sends
+    it through a circuit breaker: while Redis is down, calls fail immediately
+    with CircuitOpenError instead of each one waiting for the socket timeout.
+    """
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await _guarded(self.breaker, super().execute_command, *args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(command=str(args[0]).upper()).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        pipe = InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.breaker = self.breaker
+        return pipe
+
+
+def _connection_kwargs() -> dict:
+    kwargs = dict(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_READ_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        decode_responses=True,
+    )
+    if settings.REDIS_SSL:
+        kwargs.update(
+            connection_class=redis.SSLConnection,
+            ssl_cert_reqs=None, # For managed services we often don't verify certs if it's internal or we don't have CA
+        )
+    return kwargs
+
+
+# Blocking pool: when all connections are busy a command waits at most
+# REDIS_POOL_TIMEOUT for one instead of opening an unbounded number of sockets
+redis_pool = redis.BlockingConnectionPool(
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    **_connection_kwargs(),
 )
+
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=settings.REDIS_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.REDIS_CIRCUIT_RESET_TIMEOUT,
+)
+
+redis_client = InstrumentedRedis(connection_pool=redis_pool, breaker=redis_breaker)
+
+
+def redis_stats() -> dict:
+    return {
+        "circuit": redis_breaker.stats(),
+        "pool_max_connections": redis_pool.max_connections,
+        "pool_in_use": len(redis_pool._in_use_connections),
+        "pool_idle": len(redis_pool._available_connections),
+    }
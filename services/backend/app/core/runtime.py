@@ -0,0 +1,57 @@
+import math
+import os
+from pathlib import Path
+
+from app.core.config import settings
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> float | None:
+    """CPUs allowed by the container's CFS quota (resources.limits.cpu), None if unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> float:
+    """
+    CPUs this process can actually use: the cgroup quota if there is one,
+    otherwise the CPUs it may be scheduled on. os.cpu_count() alone reports
+    the whole node, which oversubscribes small pods on big nodes.
+    """
+    try:
+        cpus: float = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return cpus
+
+
+def worker_count(cpus: float | None = None) -> int:
+    """
+    Gunicorn workers per pod. WEB_CONCURRENCY wins when set, otherwise
+    WEB_WORKERS_PER_CPU per available CPU (rounded up), at most WEB_MAX_WORKERS.
+    The DB pool budget is split by the same number, so both must agree.
+    """
+    if settings.WEB_CONCURRENCY:
+        return settings.WEB_CONCURRENCY
+    if cpus is None:
+        cpus = available_cpus()
+    return max(1, min(settings.WEB_MAX_WORKERS, math.ceil(cpus * settings.WEB_WORKERS_PER_CPU)))
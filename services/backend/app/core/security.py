@@ -1,13 +1,13 @@
-import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Union
-from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.hash_pool import hash_pool
+from app.core.jwt_keys import key_ring
 
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None, gen: int = 0) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -18,35 +18,54 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
         "exp": int(expire.timestamp()),
         "sub": str(subject),
         "iat": int(datetime.now(timezone.utc).timestamp()),
-        "nbf": int(datetime.now(timezone.utc).timestamp())
+        "nbf": int(datetime.now(timezone.utc).timestamp()),
+        "gen": gen,
     }
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    encoded_jwt = key_ring.encode(to_encode)
     return encoded_jwt
 
-def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_refresh_token(
+    subject: Union[str, Any], expires_delta: timedelta = None, *, family: str, seq: int = 1, gen: int = 0
+) -> str:
+    # family/seq identify the token within its login session (app.core.sessions)
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(
             days=settings.REFRESH_TOKEN_EXPIRE_DAYS
         )
-    jti = str(uuid.uuid4())
     to_encode = {
         "exp": int(expire.timestamp()),
         "sub": str(subject),
         "type": "refresh",
-        "jti": jti,
+        "fam": family,
+        "seq": seq,
+        "gen": gen,
         "iat": int(datetime.now(timezone.utc).timestamp())
     }
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    encoded_jwt = key_ring.encode(to_encode)
     return encoded_jwt
 
+def decode_token(token: str) -> dict[str, Any]:
+    """Verifies a token signed by this service (any current key) and returns its claims."""
+    return key_ring.decode(token)
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    # One executor task for many passwords: a single round trip to the worker process
+    return [pwd_context.hash(password) for password in passwords]
+
+def is_password_hash(value: str) -> bool:
+    """True for hashes of a scheme we can verify (argon2, bcrypt)."""
+    return pwd_context.identify(value) is not None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await hash_pool.run(get_password_hash, password)
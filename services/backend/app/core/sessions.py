@@ -0,0 +1,175 @@
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+# One hash per user:
+#   gen          - session generation; every token carries the one it was issued
+#                  in, and tokens of an older generation are revoked (log out
+#                  everywhere, deactivation) - a single HINCRBY;
+#   f:{family}   - "seq:expires_at" of the one valid refresh token of a login
+#                  session; each refresh moves seq forward, logout deletes it.
+# The keyspace grows with users and their open sessions, not with rotations.
+SESSION_PREFIX = "user:sess:"
+GENERATION_FIELD = "gen"
+
+# Renewed on every token issued and on every revocation, so the hash (and with
+# it the generation) outlives every token that was checked against it
+SESSION_TTL_SECONDS = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+# Keys written before token families existed, still consulted for refresh
+# tokens issued back then (their jti acts as the family) until they expire.
+LEGACY_DENYLIST_PREFIX = "denylist:"
+LEGACY_REVOKED_BEFORE_PREFIX = "user:revoked_before:"
+
+# New login session: drops families whose last token has expired, registers
+# the new one and returns the current generation.
+# KEYS - user hash; ARGV - family, expires_at, now, ttl
+START_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, 2) == 'f:' then
+        local expires_at = tonumber(string.match(fields[i + 1], ':(%d+)$'))
+        if expires_at and expires_at <= tonumber(ARGV[3]) then
+            redis.call('HDEL', KEYS[1], fields[i])
+        end
+    end
+end
+redis.call('HSET', KEYS[1], 'f:' .. ARGV[1], '1:' .. ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return tonumber(redis.call('HGET', KEYS[1], 'gen') or '0')
+"""
+
+# Refresh: the token must be of the current generation and be the latest one
+# of its family. Moves the family to seq + 1 and returns the generation, or -1.
+# Of several parallel refreshes with the same token only the first succeeds.
+# KEYS - user hash, legacy denylist key, legacy revoked_before key
+# ARGV - generation, family, seq, expires_at, ttl, legacy (0/1), issued_at
+ROTATE_SCRIPT = """
+local gen = tonumber(redis.call('HGET', KEYS[1], 'gen') or '0')
+if tonumber(ARGV[1]) ~= gen then
+    return -1
+end
+local field = 'f:' .. ARGV[2]
+local current = redis.call('HGET', KEYS[1], field)
+if current then
+    if tonumber(string.match(current, '^(-?%d+):')) ~= tonumber(ARGV[3]) then
+        return -1
+    end
+elseif ARGV[6] == '1' then
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        return -1
+    end
+    local revoked_before = redis.call('GET', KEYS[3])
+    if revoked_before and tonumber(ARGV[7]) <= tonumber(revoked_before) then
+        return -1
+    end
+else
+    return -1
+end
+redis.call('HSET', KEYS[1], field, (tonumber(ARGV[3]) + 1) .. ':' .. ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return gen
+"""
+
+# Logout: ends the family if the token is its latest one. A legacy family has
+# no field yet, so it gets one that no token matches.
+# KEYS - user hash; ARGV - family, seq, expires_at, ttl, legacy (0/1)
+END_SCRIPT = """
+local field = 'f:' .. ARGV[1]
+local current = redis.call('HGET', KEYS[1], field)
+if current then
+    if tonumber(string.match(current, '^(-?%d+):')) == tonumber(ARGV[2]) then
+        redis.call('HDEL', KEYS[1], field)
+        return 1
+    end
+    return 0
+end
+if ARGV[5] == '1' then
+    redis.call('HSET', KEYS[1], field, '-1:' .. ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+class SessionStore:
+    """
+    Login sessions (refresh token families) and session generations per user.
+
+    A login starts a family; its refresh token carries (family, seq, gen) and
+    is accepted exactly once, every refresh issues the next seq. Access and
+    refresh tokens both carry `gen`; bumping it revokes every token of the
+    user at once. The current generation of a user travels with the cached
+    principal (see deps.get_current_user), so checking it costs nothing on
+    the hot path. All calls raise on Redis errors; the callers decide whether
+    that fails open or closed.
+    """
+
+    def __init__(self):
+        self._start = redis_client.register_script(START_SCRIPT)
+        self._rotate = redis_client.register_script(ROTATE_SCRIPT)
+        self._end = redis_client.register_script(END_SCRIPT)
+        self.started = 0
+        self.rotated = 0
+        self.rejected = 0
+        self.ended = 0
+
+    @staticmethod
+    def _expires_at() -> int:
+        return int(time.time()) + SESSION_TTL_SECONDS
+
+    async def generation(self, user_id: int) -> int:
+        return int(await redis_client.hget(f"{SESSION_PREFIX}{user_id}", GENERATION_FIELD) or 0)
+
+    async def start(self, user_id: int) -> tuple[str, int]:
+        """Starts a login session: returns (family, generation). The first refresh token has seq 1."""
+        family = uuid.uuid4().hex
+        gen = await self._start(
+            keys=[f"{SESSION_PREFIX}{user_id}"],
+            args=[family, self._expires_at(), int(time.time()), SESSION_TTL_SECONDS],
+        )
+        self.started += 1
+        return family, int(gen)
+
+    async def rotate(
+        self, user_id: int, family: str, seq: int, gen: int, legacy: bool = False, issued_at: int = 0
+    ) -> int | None:
+        """
+        Accepts a refresh token once. Returns the generation to issue the next
+        token (seq + 1) in, or None if the token is revoked or already used.
+        """
+        result = await self._rotate(
+            keys=[
+                f"{SESSION_PREFIX}{user_id}",
+                f"{LEGACY_DENYLIST_PREFIX}{family}",
+                f"{LEGACY_REVOKED_BEFORE_PREFIX}{user_id}",
+            ],
+            args=[gen, family, seq, self._expires_at(), SESSION_TTL_SECONDS, int(legacy), issued_at],
+        )
+        if int(result) < 0:
+            self.rejected += 1
+            return None
+        self.rotated += 1
+        return int(result)
+
+    async def end(self, user_id: int, family: str, seq: int, legacy: bool = False) -> bool:
+        ended = await self._end(
+            keys=[f"{SESSION_PREFIX}{user_id}"],
+            args=[family, seq, self._expires_at(), SESSION_TTL_SECONDS, int(legacy)],
+        )
+        self.ended += bool(ended)
+        return bool(ended)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "rotated": self.rotated,
+            "rejected": self.rejected,
+            "ended": self.ended,
+        }
+
+
+sessions = SessionStore()
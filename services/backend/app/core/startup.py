@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.logger import logger
+
+# Seconds per startup phase of this worker, reported by /api/stats
+startup_timings: dict[str, float] = {}
+
+
+async def open_db_connections(count: int) -> None:
+    """Opens `count` pool connections (per engine) at the same time and returns them to the pool."""
+    from app.db.session import engine, pool_limits, replica_engine
+
+    count = min(count, pool_limits.pool_size)
+    engines = [engine] if replica_engine is None else [engine, replica_engine]
+
+    async def connect(target):
+        conn = await target.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(
+        *(connect(target) for target in engines for _ in range(count)), return_exceptions=True
+    )
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        raise errors[0]
+
+
+async def open_redis_connections(count: int) -> None:
+    # Concurrent commands each take their own connection from the pool
+    from app.core.redis import redis_client
+
+    count = min(count, settings.REDIS_MAX_CONNECTIONS)
+    await asyncio.gather(*(redis_client.ping() for _ in range(count)))
+
+
+async def start_hash_pool() -> None:
+    from app.core import security
+    from app.core.hash_pool import hash_pool
+
+    await hash_pool.warm_up(security.get_password_hash, "warm-up")
+
+
+async def _phase(name: str, call: Callable[[], Awaitable[None]]) -> None:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(call(), timeout=settings.STARTUP_WARMUP_TIMEOUT)
+    except Exception as e:
+        # Not fatal: the readiness checks keep the worker out of rotation until
+        # the dependency is up, and the pools connect on demand.
+        logger.warning(f"Startup warm-up of {name} failed: {e!r}")
+    startup_timings[name] = round(time.perf_counter() - start, 4)
+
+
+async def warm_up(app: FastAPI) -> dict[str, Any]:
+    """
+    Gets the worker ready for its first requests: opens pooled DB and Redis
+    connections (TCP, TLS, authentication), starts the password hash workers
+    and builds the OpenAPI schema. Connections and hash workers are warmed
+    concurrently, each phase is timed separately.
+    """
+    start = time.perf_counter()
+    phases = []
+    if settings.STARTUP_DB_CONNECTIONS > 0:
+        phases.append(_phase("db", lambda: open_db_connections(settings.STARTUP_DB_CONNECTIONS)))
+    if settings.STARTUP_REDIS_CONNECTIONS > 0:
+        phases.append(_phase("redis", lambda: open_redis_connections(settings.STARTUP_REDIS_CONNECTIONS)))
+    if settings.STARTUP_WARM_HASH_POOL:
+        phases.append(_phase("hash_pool", start_hash_pool))
+    await asyncio.gather(*phases)
+
+    # CPU only: generated once here and cached on the app for /api/openapi.json
+    openapi_start = time.perf_counter()
+    app.openapi()
+    startup_timings["openapi"] = round(time.perf_counter() - openapi_start, 4)
+    startup_timings["warm_up"] = round(time.perf_counter() - start, 4)
+    return startup_timings
@@ -0,0 +1,310 @@
+import asyncio
+import codecs
+import csv
+import time
+from math import ceil
+from typing import Any, AsyncIterator
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core.config import settings
+from app.core.hash_pool import import_hash_pool
+from app.db.copy import copy_records
+from app.models.role import Role
+from app.schemas.user import UserImportRow
+
+STAGING_TABLE = "users_import"
+STAGING_COLUMNS = ("row_no", "username", "email", "hashed_password", "role_id", "is_active")
+DEFAULT_ROLE = "user"
+
+row_adapter = TypeAdapter(UserImportRow)
+
+
+class ImportFormatError(ValueError):
+    """The upload can't be read at all (encoding, missing CSV header)."""
+
+
+class ImportBusyError(Exception):
+    """Another import is running in this worker."""
+
+
+# Every batch hands one chunk to each import hash worker and the pool has no
+# queue, so a second import in the same worker would hit HashPoolFullError in
+# the middle of its file and roll back. Imports run one at a time per worker;
+# the next one is turned away before it has done anything.
+_import_lock = asyncio.Lock()
+
+
+async def parse_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """
+    Yields (row number, fields, error) from a CSV or NDJSON byte stream.
+
+    Works chunk by chunk, so the upload is never held in memory. A CSV record
+    may span several lines inside a quoted field: lines are joined while a
+    quote opened at the start of a field is still open, following the rules
+    csv.reader applies (a quote inside an unquoted field is a plain character,
+    "" inside a quoted one is an escaped quote). A quoted field that is still
+    open after IMPORT_MAX_RECORD_SIZE characters fails its row only; the lines
+    after the first one are read again as records of their own.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record_lines: list[str] = []
+    record_size = 0
+    in_quotes = False
+    header: list[str] | None = None
+    row = 0
+
+    def scan(line: str) -> None:
+        nonlocal in_quotes
+        field_start = not in_quotes
+        just_closed = False
+        for char in line:
+            if in_quotes:
+                if char == '"':
+                    in_quotes = False
+                    just_closed = True
+                continue
+            if char == '"' and (field_start or just_closed):
+                in_quotes = True
+            just_closed = False
+            field_start = char == ","
+
+    def unterminated() -> list:
+        # Fails the row that opened the quote and reads the lines after it again
+        nonlocal record_lines, record_size, in_quotes, row
+        lines, record_lines, record_size, in_quotes = record_lines[1:], [], 0, False
+        row += 1
+        results = [(row, None, "Unterminated quoted field")]
+        for line in lines:
+            results.extend(parse(line))
+        return results
+
+    def parse(line: str) -> list:
+        nonlocal record_lines, record_size, header, row
+        if fmt == "ndjson":
+            if not line.strip():
+                return []
+            row += 1
+            try:
+                fields = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                return [(row, None, "Invalid JSON")]
+            if not isinstance(fields, dict):
+                return [(row, None, "Expected a JSON object")]
+            return [(row, fields, None)]
+
+        record_lines.append(line)
+        record_size += len(line) + 1
+        scan(line)
+        if in_quotes:
+            return unterminated() if record_size > settings.IMPORT_MAX_RECORD_SIZE else []
+        values = next(csv.reader(["\n".join(record_lines) + "\n"]), [])
+        record_lines, record_size = [], 0
+        if not values:
+            return []
+        if header is None:
+            header = [name.strip() for name in values]
+            return []
+        row += 1
+        if len(values) != len(header):
+            return [(row, None, f"Expected {len(header)} columns, got {len(values)}")]
+        # Empty CSV cells mean "not given"
+        return [(row, {name: value for name, value in zip(header, values) if value != ""}, None)]
+
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                for parsed in parse(line.rstrip("\r")):
+                    yield parsed
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportFormatError("The upload is not valid UTF-8")
+    if pending:
+        for parsed in parse(pending.rstrip("\r")):
+            yield parsed
+    while record_lines:
+        for parsed in unterminated():
+            yield parsed
+    if fmt == "csv" and header is None:
+        raise ImportFormatError("CSV header is missing")
+
+
+def format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+    )
+
+
+class UserImport:
+    """
+    Bulk user import: validate -> hash in the import process pool -> COPY into a
+    temp staging table -> one INSERT ... ON CONFLICT (email) merge.
+
+    Everything runs in the caller's transaction; the staging table is dropped
+    on commit. Rows that fail validation, reference an unknown role or repeat an
+    email already seen earlier in the file are reported and not imported.
+    """
+
+    def __init__(self, db: AsyncSession, on_conflict: str = "skip", admin_id: int | None = None):
+        self.db = db
+        self.on_conflict = on_conflict
+        # The importing admin's own row is never updated (as in the bulk endpoint)
+        self.admin_id = admin_id
+        self.rows = 0
+        self.failed = 0
+        self.errors: list[dict[str, Any]] = []
+        self.hash_seconds = 0.0
+        self.copy_seconds = 0.0
+        self.merge_seconds = 0.0
+        self.inserted = 0
+        self.updated_ids: list[int] = []
+        # Updated users whose password or is_active changed: their tokens must go
+        self.revoked_ids: list[int] = []
+        self._role_ids: dict[str, int] = {}
+
+    def add_error(self, row: int, email: Any, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "email": email if isinstance(email, str) else None, "error": error})
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> dict[str, Any]:
+        if _import_lock.locked():
+            raise ImportBusyError()
+        async with _import_lock:
+            return await self._run(chunks, fmt)
+
+    async def _run(self, chunks: AsyncIterator[bytes], fmt: str) -> dict[str, Any]:
+        start = time.perf_counter()
+        roles = await self.db.execute(select(Role.name, Role.id))
+        self._role_ids = dict(roles.all())
+        await self.db.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ("
+            "row_no integer, username text, email text, hashed_password text, role_id integer, is_active boolean"
+            ") ON COMMIT DROP"
+        ))
+
+        batch: list[tuple[int, UserImportRow]] = []
+        async for row, fields, error in parse_records(chunks, fmt):
+            self.rows += 1
+            if error:
+                self.add_error(row, None, error)
+                continue
+            try:
+                item = row_adapter.validate_python(fields)
+            except ValidationError as e:
+                self.add_error(row, fields.get("email"), format_validation_error(e))
+                continue
+            if item.hashed_password is not None and not security.is_password_hash(item.hashed_password):
+                self.add_error(row, item.email, "hashed_password: unsupported hash format")
+                continue
+            if (item.role or DEFAULT_ROLE) not in self._role_ids:
+                self.add_error(row, item.email, f"role: '{item.role}' not found")
+                continue
+            batch.append((row, item))
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+        await self._merge()
+        seconds = time.perf_counter() - start
+        self.errors.sort(key=lambda e: e["row"])
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": len(self.updated_ids),
+            "skipped": self.rows - self.failed - self.inserted - len(self.updated_ids),
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds else 0.0,
+            "hash_seconds": round(self.hash_seconds, 3),
+            "copy_seconds": round(self.copy_seconds, 3),
+            "merge_seconds": round(self.merge_seconds, 3),
+        }
+
+    async def _hash(self, passwords: list[str]) -> list[str]:
+        # One chunk per worker: all workers busy, one IPC round trip each
+        if not passwords:
+            return []
+        size = ceil(len(passwords) / import_hash_pool.workers)
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        results = await asyncio.gather(*(import_hash_pool.run(security.get_password_hashes, c) for c in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    async def _flush(self, batch: list[tuple[int, UserImportRow]]) -> None:
+        start = time.perf_counter()
+        hashes = iter(await self._hash([item.password for _, item in batch if item.password is not None]))
+        self.hash_seconds += time.perf_counter() - start
+
+        records = [
+            (
+                row,
+                item.username,
+                item.email,
+                item.hashed_password if item.hashed_password is not None else next(hashes),
+                self._role_ids[item.role or DEFAULT_ROLE],
+                item.is_active,
+            )
+            for row, item in batch
+        ]
+        start = time.perf_counter()
+        await copy_records(self.db, STAGING_TABLE, STAGING_COLUMNS, records)
+        self.copy_seconds += time.perf_counter() - start
+
+    async def _merge(self) -> None:
+        start = time.perf_counter()
+        # Later rows repeating an email are errors, the first occurrence is imported
+        duplicates = await self.db.execute(text(
+            f"SELECT row_no, email FROM ("
+            f"  SELECT row_no, email, row_number() OVER (PARTITION BY email ORDER BY row_no) AS n FROM {STAGING_TABLE}"
+            f") d WHERE n > 1"
+        ))
+        for row, email in duplicates:
+            self.add_error(row, email, "email: duplicate of an earlier row in the file")
+
+        params = {}
+        if self.on_conflict == "update":
+            conflict = (
+                "DO UPDATE SET username = EXCLUDED.username, hashed_password = EXCLUDED.hashed_password, "
+                "role_id = EXCLUDED.role_id, is_active = EXCLUDED.is_active"
+            )
+            if self.admin_id is not None:
+                conflict += " WHERE users.id <> :admin_id"
+                params["admin_id"] = self.admin_id
+        else:
+            conflict = "DO NOTHING"
+        # xmax = 0 only for freshly inserted rows. Only the ids of updated users
+        # (their cached principals must go) are sent back, not one row per user;
+        # `existing` holds the values from before the merge to find the users
+        # whose password or status changed.
+        result = await self.db.execute(text(
+            f"WITH existing AS ("
+            f"  SELECT id, hashed_password, is_active FROM users"
+            f"  WHERE email IN (SELECT email FROM {STAGING_TABLE})"
+            f"), merged AS ("
+            f"  INSERT INTO users (username, email, hashed_password, role_id, is_active)"
+            f"  SELECT DISTINCT ON (email) username, email, hashed_password, role_id, is_active"
+            f"  FROM {STAGING_TABLE} ORDER BY email, row_no"
+            f"  ON CONFLICT (email) {conflict}"
+            f"  RETURNING id, (xmax = 0) AS inserted, hashed_password, is_active"
+            f") "
+            f"SELECT count(*) FILTER (WHERE inserted), "
+            f"coalesce(array_agg(merged.id) FILTER (WHERE NOT inserted), '{{}}'), "
+            f"coalesce(array_agg(merged.id) FILTER (WHERE NOT inserted AND ("
+            f"  existing.hashed_password IS DISTINCT FROM merged.hashed_password"
+            f"  OR existing.is_active IS DISTINCT FROM merged.is_active"
+            f")), '{{}}') "
+            f"FROM merged LEFT JOIN existing ON existing.id = merged.id"
+        ), params)
+        self.inserted, self.updated_ids, self.revoked_ids = result.one()
+        self.merge_seconds = time.perf_counter() - start
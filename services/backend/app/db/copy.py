@@ -0,0 +1,18 @@
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def copy_records(
+    db: AsyncSession, table: str, columns: Sequence[str], records: Iterable[tuple[Any, ...]]
+) -> None:
+    """
+    Loads rows with the binary COPY protocol on the session's own connection.
+
+    Runs inside the session's current transaction, so the rows are visible to
+    the following statements of the session (e.g. a merge from a temp table)
+    and disappear on rollback. PostgreSQL (asyncpg) only.
+    """
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=list(columns))
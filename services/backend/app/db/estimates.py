@@ -0,0 +1,33 @@
+import json
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def table_row_estimate(db: AsyncSession, table_name: str) -> int | None:
+    """
+    Row count of a whole table from planner statistics (pg_class.reltuples).
+
+    Returns None when the table has never been vacuumed/analyzed (reltuples = -1).
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name},
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+async def query_row_estimate(db: AsyncSession, query: Any) -> int:
+    """Number of rows the planner expects `query` to return (EXPLAIN, no execution)."""
+    conn = await db.connection()
+    compiled = query.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,115 @@
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.logger import logger
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_TIMEOUTS, DB_POOL_WAIT
+
+
+@dataclass
+class PoolLimits:
+    pool_size: int
+    max_overflow: int
+    # Connections a single worker may open without exceeding the server limit
+    budget: int
+
+
+def compute_pool_limits(
+    max_connections: int,
+    reserved_connections: int,
+    instances: int,
+    workers: int,
+    pool_size: int | None = None,
+    max_overflow: int | None = None,
+    dedicated: int = 0,
+) -> PoolLimits:
+    """
+    Sizes the per-worker pool so that all workers of all pods together stay
+    below the Postgres max_connections.
+
+    `instances` must include the pods that run in parallel during a rolling
+    deploy (replicas + maxSurge), otherwise the old and the new ReplicaSet
+    together exhaust the server. `dedicated` connections per worker live
+    outside the pool (the readiness probe's) and come off its budget.
+    Explicit pool_size/max_overflow take precedence.
+    """
+    available = max(1, max_connections - reserved_connections)
+    budget = max(1, available // max(1, instances * workers) - dedicated)
+
+    if pool_size is None:
+        pool_size = min(5, budget)
+    if max_overflow is None:
+        max_overflow = max(0, budget - pool_size)
+
+    if pool_size + max_overflow > budget:
+        logger.warning(
+            "DB pool %s+%s exceeds the per-worker budget of %s connections "
+            "(%s max, %s reserved, %s instances x %s workers)",
+            pool_size, max_overflow, budget, max_connections, reserved_connections, instances, workers,
+        )
+    return PoolLimits(pool_size=pool_size, max_overflow=max_overflow, budget=budget)
+
+
+class PoolWaitStats:
+    """Time spent waiting for a connection from the pool (checkout)."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        DB_POOL_WAIT.observe(seconds)
+
+
+# Module level, so the numbers survive pool.recreate() after engine.dispose()
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that measures how long each checkout waits."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_wait_stats.timeouts += 1
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        pool_wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def instrument_pool_events(engine) -> None:
+    """Keeps the checked-out/overflow gauges current on every checkout and checkin."""
+    pool = engine.sync_engine.pool
+
+    def update_gauges(*_):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+    event.listen(engine.sync_engine, "checkout", update_gauges)
+    event.listen(engine.sync_engine, "checkin", update_gauges)
+
+
+def pool_stats(pool) -> dict:
+    checkouts = pool_wait_stats.checkouts
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "checkouts": checkouts,
+        "timeouts": pool_wait_stats.timeouts,
+        "wait_seconds_avg": pool_wait_stats.wait_seconds_total / checkouts if checkouts else 0.0,
+        "wait_seconds_max": pool_wait_stats.wait_seconds_max,
+    }
+    return stats
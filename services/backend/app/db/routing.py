@@ -0,0 +1,199 @@
+"""
+Read/write splitting.
+
+Endpoints that only read declare it by depending on `get_read_db` instead of
+`get_db`. Their session picks its database on the first statement and keeps
+it for the whole request (a count and its page come from the same server):
+
+  * the replica, if one is configured and its last measured lag is at most
+    DB_REPLICA_MAX_LAG;
+  * the primary otherwise - no replica, replica lag too high or unknown, the
+    requesting user is sticky, or the invalidation channel is down.
+
+A user becomes sticky for DB_REPLICA_STICKY_SECONDS after a write to their
+account: every such write already publishes the user id on the principal
+invalidation channel, which reaches all workers of all pods. Writers whose
+own reads must see the change without a principal invalidation (an admin
+after a bulk update) call `replica_router.stick()`. Without a working
+subscription no worker can know who is sticky, so all reads go to the primary,
+and so they do for one sticky period after (re)subscribing: messages sent in
+between are lost.
+"""
+import asyncio
+import time
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import DB_READS_ROUTED, DB_REPLICA_LAG
+from app.core.principal_cache import PRINCIPAL_CHANNEL
+from app.core.pubsub import invalidation_subscriber
+from app.core.redis import redis_client
+from app.db.session import engine, replica_engine
+
+STICKY_CHANNEL = "db:sticky"
+STICKY_MAX_USERS = 100000
+
+# Seconds the replica is behind, NULL (unknown) while its WAL receiver is not
+# streaming: a disconnected receiver stops both LSNs, so "everything received
+# is replayed" alone would report a replica that falls further behind as fresh.
+# While streaming, an idle primary writes no transactions to compare replay
+# timestamps against; there "all received WAL replayed" means zero lag.
+# pg_stat_wal_receiver.status is NULL without pg_read_all_stats (pg_monitor),
+# which then keeps all reads on the primary.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+
+class ReplicaRouter:
+    """Chooses the engine of read-only sessions and tracks replica lag and sticky users."""
+
+    def __init__(self, primary: AsyncEngine, replica: AsyncEngine | None):
+        self.primary = primary
+        self.replica = replica
+        self.sticky = TTLCache(maxsize=STICKY_MAX_USERS, ttl=settings.DB_REPLICA_STICKY_SECONDS)
+        self.ready = False
+        self._subscribed_at = 0.0
+        self.lag: float | None = None
+        self._checked_at = 0.0
+        self._task: asyncio.Task | None = None
+        self.reads = {"replica": 0, "no_replica": 0, "sticky": 0, "lagging": 0, "no_subscription": 0}
+
+    def replica_usable(self) -> bool:
+        fresh = time.monotonic() - self._checked_at <= 3 * settings.DB_REPLICA_CHECK_INTERVAL
+        return self.lag is not None and fresh and self.lag <= settings.DB_REPLICA_MAX_LAG
+
+    def choose(self, user_id: int | None = None) -> AsyncEngine:
+        if self.replica is None:
+            reason = "no_replica"
+        elif not self.ready or time.monotonic() - self._subscribed_at < settings.DB_REPLICA_STICKY_SECONDS:
+            reason = "no_subscription"
+        elif user_id is not None and self.sticky.get(user_id):
+            reason = "sticky"
+        elif not self.replica_usable():
+            reason = "lagging"
+        else:
+            reason = "replica"
+        self.reads[reason] += 1
+        DB_READS_ROUTED.labels(target="replica" if reason == "replica" else "primary", reason=reason).inc()
+        return self.replica if reason == "replica" else self.primary
+
+    async def stick(self, *user_ids: int) -> None:
+        """Sends the users' reads to the primary on every worker for DB_REPLICA_STICKY_SECONDS."""
+        self._mark(user_ids)
+        if self.replica is None:
+            return
+        try:
+            await redis_client.publish(STICKY_CHANNEL, ",".join(str(user_id) for user_id in user_ids))
+        except Exception as e:
+            logger.warning(f"Publishing sticky users {user_ids} failed: {e}")
+
+    def _mark(self, user_ids) -> None:
+        for user_id in user_ids:
+            self.sticky.set(int(user_id), True)
+
+    def _on_message(self, data: str) -> None:
+        self._mark(data.split(","))
+
+    async def _on_connect(self) -> None:
+        self._subscribed_at = time.monotonic()
+        self.ready = True
+
+    def _on_disconnect(self) -> None:
+        self.ready = False
+
+    async def measure_lag(self) -> float | None:
+        try:
+            async def query():
+                async with self.replica.connect() as conn:
+                    return (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+
+            lag = await asyncio.wait_for(query(), timeout=settings.HEALTH_CHECK_TIMEOUT)
+            self.lag = None if lag is None else float(lag)
+        except Exception as e:
+            if self.lag is not None:
+                logger.warning(f"Replica lag check failed, reading from the primary: {e!r}")
+            self.lag = None
+        self._checked_at = time.monotonic()
+        DB_REPLICA_LAG.set(-1 if self.lag is None else self.lag)
+        return self.lag
+
+    async def start(self) -> None:
+        if self.replica is not None and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="replica-lag")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.measure_lag()
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "configured": self.replica is not None,
+            "subscribed": self.ready,
+            "lag_seconds": self.lag,
+            "usable": self.replica is not None and self.replica_usable(),
+            "sticky_users": len(self.sticky),
+            "reads": dict(self.reads),
+        }
+
+
+replica_router = ReplicaRouter(engine, replica_engine)
+invalidation_subscriber.register(
+    PRINCIPAL_CHANNEL,
+    replica_router._on_message,
+    on_connect=replica_router._on_connect,
+    on_disconnect=replica_router._on_disconnect,
+)
+invalidation_subscriber.register(STICKY_CHANNEL, replica_router._on_message)
+
+
+class RoutingSession(Session):
+    """Session of get_read_db: bound on the first statement to the engine the router picks."""
+
+    def get_bind(self, mapper=None, **kw):
+        bind = self.info.get("bind")
+        if bind is None:
+            bind = self.info["bind"] = replica_router.choose(self.info.get("user_id")).sync_engine
+        return bind
+
+
+ReadSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+)
+
+
+async def get_read_db():
+    """
+    Session for endpoints that never write. Set `db.info["user_id"]` before
+    the first statement to route the user's reads to the primary while sticky
+    (get_current_user does).
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -4,19 +4,25 @@ import urllib.parse
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.engine import URL
 from app.core.config import settings
+from app.core.logger import logger
+from app.core.runtime import worker_count
+from app.db.pool import InstrumentedAsyncQueuePool, compute_pool_limits, instrument_pool_events
 
-def get_engine_settings():
+def get_engine_settings(host: str | None = None, port: int | None = None):
     # Construct URL object directly to avoid parsing/escaping issues
     url = URL.create(
         drivername="postgresql+asyncpg",
         username=settings.DB_USER,
         password=settings.DB_PASSWORD,
-        host=settings.DB_HOST,
-        port=settings.DB_PORT,
+        host=host or settings.DB_HOST,
+        port=port or settings.DB_PORT,
         database=settings.DB_NAME,
     )
     
-    connect_args = {}
+    connect_args = {
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    }
     ssl_mode = settings.DB_SSL_MODE
     ssl_root_cert = settings.DB_SSL_ROOT_CERT
     
@@ -45,7 +51,29 @@ def get_engine_settings():
 
 database_url, connect_args = get_engine_settings()
 
-engine = create_async_engine(database_url, echo=True, connect_args=connect_args)
+pool_limits = compute_pool_limits(
+    max_connections=settings.DB_MAX_CONNECTIONS,
+    reserved_connections=settings.DB_RESERVED_CONNECTIONS,
+    instances=settings.DB_APP_INSTANCES,
+    workers=worker_count(),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    dedicated=1,
+)
+logger.debug("DB pool limits: %s", pool_limits)
+
+engine = create_async_engine(
+    database_url,
+    echo=settings.DB_ECHO,
+    connect_args=connect_args,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=pool_limits.pool_size,
+    max_overflow=pool_limits.max_overflow,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+instrument_pool_events(engine)
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     autoflush=False,
@@ -54,6 +82,34 @@ AsyncSessionLocal = async_sessionmaker(
     class_=AsyncSession
 )
 
+# The readiness probe's own connection (app.core.health): a pool that is
+# saturated at peak must neither delay the probe nor be reported as a dead database
+health_engine = create_async_engine(
+    database_url,
+    connect_args=connect_args,
+    pool_size=1,
+    max_overflow=0,
+    pool_timeout=settings.HEALTH_CHECK_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+
+# Streaming replica for read-only endpoints (app.db.routing). Same credentials
+# and pool sizing as the primary; its pool is not part of the db_pool metrics.
+replica_engine = None
+if settings.DB_REPLICA_HOST:
+    replica_url, replica_connect_args = get_engine_settings(settings.DB_REPLICA_HOST, settings.DB_REPLICA_PORT)
+    replica_engine = create_async_engine(
+        replica_url,
+        echo=settings.DB_ECHO,
+        connect_args=replica_connect_args,
+        pool_size=pool_limits.pool_size,
+        max_overflow=pool_limits.max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
@@ -1,27 +1,51 @@
+import time
+
+# Everything below (the whole app and its dependencies) counts as the import phase
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-import time
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.logger import logger
 from app.api.api import api_router
+from app.core.hash_pool import hash_pool, import_hash_pool, HashPoolFullError
+from app.core.middleware import HTTPSRedirectMiddleware, MetricsMiddleware, RequestLoggingMiddleware
 
 from app.core.redis import redis_client
-from fastapi_limiter import FastAPILimiter
+from app.core.pubsub import invalidation_subscriber
+from app.core.health import health_monitor
+from app.core.startup import startup_timings, warm_up
+from app.db.routing import replica_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
-    try:
-        await FastAPILimiter.init(redis_client)
-        logger.info("FastAPILimiter initialized.")
-    except Exception as e:
-        logger.error(f"Failed to initialize FastAPILimiter: {e}")
-    
-    logger.info("Application startup complete.")
+    await invalidation_subscriber.start()
+    await warm_up(app)
+    await replica_router.start()
+    # Started warm, so its first result already reflects the real dependencies
+    await health_monitor.start()
+
+    logger.info(
+        "Application startup complete: "
+        + ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in startup_timings.items())
+    )
     yield
     # Shutdown logic
+    await health_monitor.stop()
+    await replica_router.stop()
+    await invalidation_subscriber.stop()
     await redis_client.close()
+    # Close the pooled connections instead of leaving them to the server's timeout
+    from app.db.session import engine, health_engine, replica_engine
+    await engine.dispose()
+    await health_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    hash_pool.shutdown()
+    import_hash_pool.shutdown()
     logger.info("Shutting down gracefully...")
 
 def create_app() -> FastAPI:
@@ -31,42 +55,23 @@ def create_app() -> FastAPI:
         docs_url="/api/docs",
         redoc_url="/api/redoc",
         openapi_url="/api/openapi.json",
+        default_response_class=ORJSONResponse,
     )
     
-    @app.middleware("http")
-    async def https_redirect_middleware(request: Request, call_next):
-        # Check if we are behind a proxy that terminates SSL
-        x_forwarded_proto = request.headers.get("x-forwarded-proto")
-        
-        # If the request is not HTTPS and we are not in DEBUG mode
-        if not settings.DEBUG and x_forwarded_proto != "https":
-            # You can either redirect or return 400. CSRF requirement suggested redirect or 400.
-            # Redirecting to the same URL but with https
-            url = request.url.replace(scheme="https")
-            from fastapi.responses import RedirectResponse
-            return RedirectResponse(url, status_code=301)
-        
-        return await call_next(request)
+    # Pure ASGI middlewares: the last one added is the outermost, so requests go
+    # CORS -> metrics -> logging -> HTTPS redirect -> routes.
+    app.add_middleware(HTTPSRedirectMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        try:
-            response = await call_next(request)
-        except Exception as e:
-            logger.exception(f"Unhandled exception during request: {e}")
-            from fastapi.responses import JSONResponse
-            response = JSONResponse(
-                status_code=500,
-                content={"detail": "Internal Server Error"}
-            )
-        
-        duration = time.time() - start_time
-        logger.info(
-            f"Method: {request.method} Path: {request.url.path} "
-            f"Status: {response.status_code} Duration: {duration:.4f}s"
+    @app.exception_handler(HashPoolFullError)
+    async def hash_pool_full_handler(request: Request, exc: HashPoolFullError):
+        # Backpressure: too many logins/registrations are hashing right now
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service temporarily unavailable, please try later"},
+            headers={"Retry-After": "1"},
         )
-        return response
 
     # Configure CORS - added AFTER other middlewares to be processed FIRST for responses
     app.add_middleware(
@@ -81,3 +86,4 @@ def create_app() -> FastAPI:
     return app
 
 app = create_app()
+startup_timings["import"] = round(time.perf_counter() - _import_started, 4)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, ForeignKey, inspect
+from sqlalchemy import String, Boolean, ForeignKey, Index, inspect
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 from typing import TYPE_CHECKING,Dict, Any
@@ -8,9 +8,22 @@ if TYPE_CHECKING:
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Serves ORDER BY username, id and keyset pagination in the admin listing
+        Index("ix_users_username_id", "username", "id"),
+        # pg_trgm GIN indexes for substring (ILIKE '%term%') and fuzzy admin search
+        Index(
+            "ix_users_username_trgm", "username",
+            postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    username: Mapped[str] = mapped_column(String(50), index=True, nullable=False)
+    username: Mapped[str] = mapped_column(String(50), nullable=False)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     role_id: Mapped[int] = mapped_column(ForeignKey("roles.id"), nullable=True)
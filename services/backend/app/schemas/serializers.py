@@ -0,0 +1,16 @@
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.schemas.user import User
+
+# Built once at import. Serializing straight to JSON bytes skips FastAPI's
+# response_model round trip (validate -> dump to Python -> json.dumps).
+user_serializer = TypeAdapter(User)
+
+
+def user_response(user: Any) -> Response:
+    """Serializes an ORM User (with role_obj loaded) as the `User` schema."""
+    value = user_serializer.validate_python(user, from_attributes=True)
+    return Response(content=user_serializer.dump_json(value), media_type="application/json")
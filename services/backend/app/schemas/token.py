@@ -9,4 +9,10 @@ class TokenPayload(BaseModel):
     sub: Optional[int] = None
     type: Optional[str] = None
     exp: Optional[int] = None
+    iat: Optional[int] = None
+    # Only in refresh tokens issued before token families (the jti is their family)
     jti: Optional[str] = None
+    # Session generation, refresh token family and position in it (app.core.sessions)
+    gen: int = 0
+    fam: Optional[str] = None
+    seq: Optional[int] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
+from typing import Literal, Optional
 from app.schemas.role import Role
 
 class UserBase(BaseModel):
@@ -26,3 +26,78 @@ class User(UserInDBBase):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+class UserListItem(BaseModel):
+    id: int
+    username: str
+    email: EmailStr
+    role_name: Optional[str] = None
+    role_id: Optional[int] = None
+    is_active: bool
+
+class UserPage(BaseModel):
+    users: list[UserListItem]
+    total: Optional[int] = None
+    total_estimated: bool = False
+    next_cursor: Optional[str] = None
+
+class UserBulkFilter(BaseModel):
+    search: Optional[str] = None
+    search_mode: Literal["substring", "fuzzy"] = "substring"
+    role: Optional[str] = None
+
+class UserBulkAction(BaseModel):
+    action: Literal["activate", "deactivate", "set_role"]
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[UserBulkFilter] = None
+    # Target role name for action=set_role
+    role: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Exactly one of 'ids' or 'filter' must be given")
+        if self.filter is not None and not (self.filter.search or self.filter.role):
+            raise ValueError("Filter must contain 'search' or 'role'")
+        if (self.action == "set_role") != (self.role is not None):
+            raise ValueError("'role' is required for action 'set_role' and only allowed there")
+        return self
+
+class UserBulkResult(BaseModel):
+    action: str
+    updated: int
+    tokens_revoked: int
+
+class UserImportRow(BaseModel):
+    username: str = Field(..., min_length=1, max_length=50)
+    email: EmailStr = Field(..., max_length=255)
+    # Either a plain password (hashed during the import) or an existing argon2/bcrypt hash
+    password: Optional[str] = Field(None, min_length=8)
+    hashed_password: Optional[str] = None
+    role: Optional[str] = None
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("Exactly one of 'password' or 'hashed_password' must be given")
+        return self
+
+class UserImportError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    error: str
+
+class UserImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    failed: int
+    errors: list[UserImportError]
+    errors_truncated: bool
+    seconds: float
+    rows_per_second: float
+    hash_seconds: float
+    copy_seconds: float
+    merge_seconds: float
@@ -0,0 +1,294 @@
+"""
+Latency and throughput of the auth and admin hot paths.
+
+Drives the real application (app.main.create_app) in-process through httpx's
+ASGI transport, so the numbers contain the whole middleware, dependency,
+serialization and DB/Redis client stack, but no network time:
+  * login        - POST /api/auth/login (Argon2 verify, rate limits, token issue);
+  * me           - GET /api/auth/me (JWT decode, principal cache, session generation);
+  * refresh      - POST /api/auth/refresh (token family script, user lookup, rotation);
+  * logout       - POST /api/auth/logout (ends the token family);
+  * admin_users  - GET /api/admin/users (a 100-user page with the total).
+
+Redis is an in-memory fakeredis server and the database is an in-memory
+SQLite by default, or any disposable PostgreSQL given with --database-url
+(its tables are dropped and recreated!). Extra packages, not needed by the
+service itself:
+
+    pip install -r benchmarks/requirements.txt
+
+Run from services/backend:
+
+    python -m benchmarks.api_paths --output bench.json
+    python -m benchmarks.api_paths --baseline bench.json --max-regression 0.25
+
+With --baseline the run fails (exit code 1) when the p95 latency of a path
+grows, or its throughput drops, by more than --max-regression compared to
+the baseline file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+# Rate limits are parsed when the routes are imported. Keep the limiter on the
+# measured path, but with limits no benchmark run can reach.
+for _name in ("RATE_LIMIT_LOGIN_PER_IP", "RATE_LIMIT_LOGIN_PER_ACCOUNT", "RATE_LIMIT_LOGIN_GLOBAL"):
+    os.environ.setdefault(_name, "1000000000/60")
+# The app's own engine is not the benchmark database, don't warm it up
+os.environ.setdefault("STARTUP_DB_CONNECTIONS", "0")
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core import security
+from app.core.logger import logger
+from app.core.sessions import sessions
+
+HEADERS = {"x-forwarded-proto": "https"}
+PASSWORD = "benchmark-password"
+PATHS = ("login", "me", "refresh", "logout", "admin_users")
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summarize(latencies: list[float], errors: int, seconds: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "rps": round(count / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[str]:
+    """Paths that got slower (p95) or lost throughput by more than max_regression (0.25 = 25%)."""
+    regressions = []
+    for path, result in current["results"].items():
+        base = baseline.get("results", {}).get(path)
+        if not base:
+            continue
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{path}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        if base["rps"] and result["rps"] < base["rps"] * (1 - max_regression):
+            regressions.append(f"{path}: throughput {base['rps']:.1f} -> {result['rps']:.1f} req/s")
+        if result["errors"]:
+            regressions.append(f"{path}: {result['errors']} failed requests")
+    return regressions
+
+
+def use_fake_redis() -> None:
+    import fakeredis
+    from redis.asyncio import ConnectionPool
+
+    from app.core.redis import redis_client
+
+    # Scripts registered at import time are bound to the client, not the pool
+    redis_client.connection_pool = ConnectionPool(
+        connection_class=fakeredis.FakeAsyncConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True,
+    )
+
+
+async def prepare_database(database_url: str, users: int) -> AsyncEngine:
+    from app.models import Base, Role, User
+
+    if database_url.startswith("sqlite"):
+        # One shared connection, otherwise every session gets its own empty in-memory DB
+        engine = create_async_engine(database_url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_async_engine(database_url, pool_size=20, max_overflow=0)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    # Every user gets the same hash: seeding must not take longer than the run
+    hashed_password = security.get_password_hash(PASSWORD)
+    async with AsyncSession(engine) as db:
+        db.add_all([Role(id=1, name="admin", description="Administrator"), Role(id=2, name="user", description="User")])
+        await db.flush()
+        db.add_all(
+            User(
+                id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password=hashed_password,
+                role_id=1 if i == 1 else 2, is_active=True,
+            )
+            for i in range(1, users + 1)
+        )
+        await db.commit()
+    return engine
+
+
+async def run_path(name: str, requests: int, concurrency: int, call) -> dict:
+    """Runs `requests` calls of `call(worker, n)` on `concurrency` workers, timing each one."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker(index: int) -> None:
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            ok = await call(index, n)
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    logger.debug("Benchmark %s: %s", name, result)
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    use_fake_redis()
+    engine = await prepare_database(args.database_url, args.users)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    from app.db.routing import get_read_db
+    from app.db.session import get_db
+    from app.main import create_app
+
+    async def get_bench_db():
+        async with session_factory() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_db] = get_bench_db
+    app.dependency_overrides[get_read_db] = get_bench_db
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, client=("203.0.113.10", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench", headers=HEADERS) as client:
+            admin_token = security.create_access_token(1)
+            user_tokens = [security.create_access_token(2 + i % (args.users - 1)) for i in range(args.concurrency)]
+            async def new_session(user_id: int) -> str:
+                family, gen = await sessions.start(user_id)
+                return security.create_refresh_token(user_id, family=family, gen=gen)
+
+            # One refresh chain per worker: every refresh rotates the worker's token
+            refresh_tokens = [await new_session(2 + i % (args.users - 1)) for i in range(args.concurrency)]
+
+            async def login(worker: int, n: int) -> bool:
+                user_id = 1 + n % args.users
+                response = await client.post(
+                    "/api/auth/login", data={"username": f"user{user_id}@example.com", "password": PASSWORD},
+                )
+                return response.status_code == 200
+
+            async def me(worker: int, n: int) -> bool:
+                response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {user_tokens[worker]}"})
+                return response.status_code == 200
+
+            async def refresh(worker: int, n: int) -> bool:
+                response = await client.post(
+                    "/api/auth/refresh", headers={"Authorization": f"Bearer {refresh_tokens[worker]}"},
+                )
+                token = response.cookies.get("refresh_token")
+                if token:
+                    refresh_tokens[worker] = token
+                return response.status_code == 200
+
+            logout_tokens = [await new_session(1 + n % args.users) for n in range(args.requests)]
+
+            async def logout(worker: int, n: int) -> bool:
+                response = await client.post(
+                    "/api/auth/logout", headers={"Cookie": f"refresh_token={logout_tokens[n]}"},
+                )
+                return response.status_code == 200
+
+            admin_pages = max(1, -(-args.users // 100))
+
+            async def admin_users(worker: int, n: int) -> bool:
+                # Walks all pages, so deep offsets are part of the measurement
+                response = await client.get(
+                    "/api/admin/users", params={"page": 1 + n % admin_pages, "limit": 100},
+                    headers={"Authorization": f"Bearer {admin_token}"},
+                )
+                return response.status_code == 200
+
+            calls = {"login": login, "me": me, "refresh": refresh, "logout": logout, "admin_users": admin_users}
+            for name in args.paths:
+                requests = args.login_requests if name == "login" else args.requests
+                # Warm up connections, caches and lazy imports outside of the measurement
+                await run_path(name, min(requests, args.concurrency * 2), args.concurrency, calls[name])
+                results[name] = await run_path(name, requests, args.concurrency, calls[name])
+    await engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split("://")[0],
+            "users": args.users,
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict) -> None:
+    print(f"{'path':<12} {'req':>6} {'err':>4} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in report["results"].items():
+        print(
+            f"{name:<12} {r['requests']:>6} {r['errors']:>4} {r['rps']:>9.1f} "
+            f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per path")
+    parser.add_argument("--login-requests", type=int, default=200, help="login is Argon2-bound, so fewer by default")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Keep the log formatting cost (it's part of every request) but not the stdout writes
+    logger.handlers = [logging.NullHandler()]
+    report = asyncio.run(run(args))
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Per-request overhead of the HTTP middleware stack.
+
+Compares three otherwise identical apps with a trivial endpoint:
+  * bare       - no custom middleware;
+  * decorator  - the previous @app.middleware("http") implementation (BaseHTTPMiddleware);
+  * asgi       - the pure ASGI middlewares from app.core.middleware.
+
+Requests are driven in-process through httpx's ASGI transport, so the numbers
+contain no network time. Run from services/backend:
+
+    python -m benchmarks.middleware_overhead --requests 5000
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.middleware import HTTPSRedirectMiddleware, RequestLoggingMiddleware
+
+
+def add_endpoint(app: FastAPI) -> FastAPI:
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+    return app
+
+
+def bare_app() -> FastAPI:
+    return add_endpoint(FastAPI())
+
+
+def decorator_app() -> FastAPI:
+    # Copy of the middlewares that used to live in app.main.create_app
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def https_redirect_middleware(request: Request, call_next):
+        x_forwarded_proto = request.headers.get("x-forwarded-proto")
+        if not settings.DEBUG and x_forwarded_proto != "https":
+            url = request.url.replace(scheme="https")
+            return RedirectResponse(url, status_code=301)
+        return await call_next(request)
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            logger.exception(f"Unhandled exception during request: {e}")
+            response = JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+        duration = time.time() - start_time
+        logger.info(
+            f"Method: {request.method} Path: {request.url.path} "
+            f"Status: {response.status_code} Duration: {duration:.4f}s"
+        )
+        return response
+
+    return add_endpoint(app)
+
+
+def asgi_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(HTTPSRedirectMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    return add_endpoint(app)
+
+
+async def measure(app: FastAPI, requests: int, warmup: int = 200) -> float:
+    """Mean wall time per request in microseconds."""
+    headers = {"x-forwarded-proto": "https"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(warmup):
+            await client.get("/api/health", headers=headers)
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = await client.get("/api/health", headers=headers)
+            assert response.status_code == 200
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int, rounds: int) -> None:
+    # Keep the log line formatting cost (it's part of the middleware) but not stdout writes
+    logger.handlers, handlers = [logging.NullHandler()], logger.handlers
+    try:
+        apps = {"bare": bare_app(), "decorator": decorator_app(), "asgi": asgi_app()}
+        results = {name: [] for name in apps}
+        for _ in range(rounds):
+            for name, app in apps.items():
+                results[name].append(await measure(app, requests))
+    finally:
+        logger.handlers = handlers
+
+    best = {name: min(values) for name, values in results.items()}
+    print(f"{'stack':<10} {'us/request':>11} {'overhead':>10}")
+    for name, value in best.items():
+        print(f"{name:<10} {value:>11.1f} {value - best['bare']:>+10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
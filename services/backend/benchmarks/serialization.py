@@ -0,0 +1,74 @@
+"""
+Encode time of a 100-user admin page and of a single /auth/me user.
+
+Compares the previous response paths with the current ones on the same
+in-memory ORM objects (no DB, no HTTP):
+  * page/jsonable  - dicts -> jsonable_encoder -> json.dumps (old `response_model=Any`);
+  * page/model     - dicts validated into UserPage -> Python -> json.dumps (a plain response_model);
+  * page/orjson    - dicts -> orjson, as returned by admin.read_users now;
+  * me/model       - User schema from_attributes -> Python -> json.dumps (old `response_model=UserSchema`);
+  * me/typeadapter - precompiled TypeAdapter straight to JSON bytes (serializers.user_response).
+
+Run from services/backend:
+
+    python -m benchmarks.serialization --number 2000
+"""
+import argparse
+import json
+import timeit
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.serializers import user_response
+from app.schemas.user import User as UserSchema, UserPage
+
+
+def make_users(count: int) -> list[User]:
+    role = Role(id=2, name="user", description="Regular user")
+    return [
+        User(
+            id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x",
+            role_id=role.id, is_active=True, role_obj=role,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def page(users: list[User]) -> dict:
+    return {"users": [u.serialization() for u in users], "total": 10_000, "total_estimated": False}
+
+
+def main(number: int, page_size: int) -> None:
+    users = make_users(page_size)
+    page_model = TypeAdapter(UserPage)
+    user_model = TypeAdapter(UserSchema)
+
+    cases = {
+        "page/jsonable": lambda: json.dumps(jsonable_encoder(page(users))),
+        "page/model": lambda: json.dumps(page_model.dump_python(page_model.validate_python(page(users)), mode="json")),
+        "page/orjson": lambda: orjson.dumps(page(users)),
+        "me/model": lambda: json.dumps(
+            user_model.dump_python(user_model.validate_python(users[0], from_attributes=True), mode="json")
+        ),
+        "me/typeadapter": lambda: user_response(users[0]).body,
+    }
+    # Building the dicts from ORM objects is shared by every page case
+    baseline = min(timeit.repeat(lambda: page(users), number=number, repeat=3)) / number * 1e6
+
+    print(f"{'case':<16} {'us/op':>9} {'encode us':>10}")
+    for name, case in cases.items():
+        value = min(timeit.repeat(case, number=number, repeat=3)) / number * 1e6
+        encode = value - baseline if name.startswith("page/") else value
+        print(f"{name:<16} {value:>9.1f} {encode:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.number, args.page_size)
@@ -2,6 +2,12 @@
 
 set -e
 
+# Per-worker Prometheus samples; wiped on start so stale files of a previous
+# container run don't leak into the merged metrics
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
 
 echo "Starting application..."
-exec gunicorn app.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --access-logfile - --error-logfile -
+# Workers, timeouts and hooks: gunicorn.conf.py (configured through env variables)
+exec gunicorn -c gunicorn.conf.py
@@ -0,0 +1,70 @@
+# Gunicorn runtime: every setting comes from app.core.config.Settings (env
+# variables), see entrypoint.sh for the command line.
+import os
+
+from app.core.config import settings
+from app.core.runtime import available_cpus, worker_count
+
+wsgi_app = "app.main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = settings.GUNICORN_BIND
+workers = worker_count()
+# The workers split the DB connection budget (app.db.session) by this very
+# number: they inherit the settings object and, for re-execs, the env variable
+settings.WEB_CONCURRENCY = workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+max_requests = settings.GUNICORN_MAX_REQUESTS
+max_requests_jitter = settings.GUNICORN_MAX_REQUESTS_JITTER
+keepalive = settings.GUNICORN_KEEPALIVE
+timeout = settings.GUNICORN_TIMEOUT
+# On SIGTERM the workers stop accepting and finish what is in flight; after
+# graceful_timeout the master kills them
+graceful_timeout = settings.GUNICORN_GRACEFUL_TIMEOUT
+preload_app = settings.GUNICORN_PRELOAD_APP
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info(
+        f"Starting {workers} workers ({available_cpus():g} CPUs available, "
+        f"max_requests {max_requests}+{max_requests_jitter}, keepalive {keepalive}s, "
+        f"graceful_timeout {graceful_timeout}s)"
+    )
+    # Merges the per-worker samples (PROMETHEUS_MULTIPROC_DIR, see entrypoint.sh).
+    # Only prometheus_client is used here, app.core.metrics stays out of the master.
+    if settings.METRICS_PORT and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(settings.METRICS_PORT, registry=registry)
+        server.log.info(f"Serving metrics on port {settings.METRICS_PORT}")
+
+
+def post_fork(server, worker):
+    # With preload_app the master has imported the app: its pooled sockets
+    # would be shared by every child. Drop them without closing (that would
+    # close the master's copy too); each worker opens its own on first use.
+    # The log listener thread did not survive the fork: start the worker's own.
+    import sys
+
+    logger = sys.modules.get("app.core.logger")
+    if logger is not None:
+        logger.start_listener()
+    session = sys.modules.get("app.db.session")
+    if session is not None:
+        session.engine.sync_engine.dispose(close=False)
+    redis = sys.modules.get("app.core.redis")
+    if redis is not None:
+        redis.redis_pool.reset()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges (in-flight requests, pool connections) of a dead worker
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+
+from app.api.endpoints.admin import bulk_update_users
+from app.schemas.user import UserBulkAction
+
+def test_bulk_action_needs_exactly_one_target():
+    UserBulkAction(action="deactivate", ids=[1, 2])
+    UserBulkAction(action="activate", filter={"role": "user"})
+    with pytest.raises(ValidationError):
+        UserBulkAction(action="deactivate")
+    with pytest.raises(ValidationError):
+        UserBulkAction(action="deactivate", ids=[1], filter={"role": "user"})
+    # An empty filter would match every user
+    with pytest.raises(ValidationError):
+        UserBulkAction(action="deactivate", filter={})
+
+def test_role_only_with_set_role():
+    UserBulkAction(action="set_role", ids=[1], role="admin")
+    with pytest.raises(ValidationError):
+        UserBulkAction(action="set_role", ids=[1])
+    with pytest.raises(ValidationError):
+        UserBulkAction(action="activate", ids=[1], role="admin")
+
+def run_bulk(bulk_in, updated_ids, invalidate=None):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = updated_ids
+    db = AsyncMock()
+    db.execute.return_value = result
+    admin = MagicMock(id=1)
+    with patch("app.api.endpoints.admin.principal_cache") as cache, \
+         patch("app.api.endpoints.admin.replica_router") as router:
+        cache.invalidate = invalidate or AsyncMock()
+        router.stick = AsyncMock()
+        try:
+            response = asyncio.run(bulk_update_users(bulk_in, db=db, current_user=admin))
+        except HTTPException as e:
+            response = e
+    sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    return response, db, cache, sql
+
+def test_deactivate_skips_the_admin_and_revokes_before_commit():
+    response, db, cache, sql = run_bulk(UserBulkAction(action="deactivate", ids=[1, 2, 3]), [2, 3])
+    assert "users.id != %(id_1)s" in sql and "users.is_active IS NOT false" in sql
+    # Only the rows that changed are counted and revoked
+    assert response == {"action": "deactivate", "updated": 2, "tokens_revoked": 2}
+    cache.invalidate.assert_awaited_once_with(2, 3, revoke_tokens=True, strict=True)
+    db.commit.assert_awaited_once()
+
+def test_failed_revocation_rolls_back():
+    invalidate = AsyncMock(side_effect=ConnectionError("redis down"))
+    response, db, _, _ = run_bulk(UserBulkAction(action="deactivate", ids=[2]), [2], invalidate)
+    assert response.status_code == 503
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+def test_demotion_rolls_back_without_cache_invalidation():
+    invalidate = AsyncMock(side_effect=ConnectionError("redis down"))
+    response, db, _, _ = run_bulk(UserBulkAction(action="set_role", ids=[2], role="user"), [2], invalidate)
+    assert response.status_code == 503
+    invalidate.assert_awaited_once_with(2, revoke_tokens=False, strict=True)
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+def test_filter_over_the_limit_is_refused():
+    with patch("app.api.endpoints.admin.settings.ADMIN_BULK_MAX_ROWS", 2):
+        response, db, cache, sql = run_bulk(UserBulkAction(action="activate", filter={"search": "user"}), [2, 3, 4])
+    assert "LIMIT" in sql
+    assert response.status_code == 400
+    db.rollback.assert_awaited_once()
+    cache.invalidate.assert_not_awaited()
+
+def test_activate_commits_then_invalidates():
+    response, db, cache, _ = run_bulk(UserBulkAction(action="activate", ids=[2]), [2])
+    assert response == {"action": "activate", "updated": 1, "tokens_revoked": 0}
+    db.commit.assert_awaited_once()
+    cache.invalidate.assert_awaited_once_with(2)
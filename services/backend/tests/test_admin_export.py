@@ -0,0 +1,25 @@
+import json
+
+from app.api.endpoints.admin import EXPORT_COLUMNS, encode_csv_rows, encode_ndjson_rows
+
+ROWS = [(1, "admin", "admin@example.com", "admin", 1, True), (2, 'o"neil, jr', "o@example.com", None, None, False)]
+
+def test_csv_rows_are_quoted():
+    text = encode_csv_rows([EXPORT_COLUMNS, *ROWS]).decode()
+    lines = text.splitlines()
+    assert lines[0] == "id,username,email,role_name,role_id,is_active"
+    assert lines[2] == '2,"o""neil, jr",o@example.com,,,False'
+
+def test_csv_formula_cells_are_neutralized():
+    rows = [(3, "=HYPERLINK(\"http://x\")", "@sum@example.com", "-admin", -1, True)]
+    line = encode_csv_rows(rows).decode().strip()
+    assert line == '3,"\'=HYPERLINK(""http://x"")",\'@sum@example.com,\'-admin,-1,True'
+    # NDJSON is data, not a spreadsheet: values stay as they are
+    assert json.loads(encode_ndjson_rows(rows))["username"] == "=HYPERLINK(\"http://x\")"
+
+def test_ndjson_one_object_per_line():
+    lines = encode_ndjson_rows(ROWS).decode().splitlines()
+    assert [json.loads(line) for line in lines][1] == {
+        "id": 2, "username": 'o"neil, jr', "email": "o@example.com",
+        "role_name": None, "role_id": None, "is_active": False,
+    }
@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.redis import InstrumentedRedis
+
+def test_opens_after_consecutive_failures_and_probes_once():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=5.0)
+    breaker.before_call(); breaker.record_failure()
+    breaker.before_call(); breaker.record_success()
+    breaker.before_call(); breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call(); breaker.record_failure()
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    with patch("app.core.circuit_breaker.time.monotonic", return_value=breaker._opened_at + 6):
+        breaker.before_call()
+        assert breaker.state == "half_open"
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["rejected"] == 2
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.0)
+    for _ in range(5):
+        breaker.before_call(); breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+def test_unreachable_redis_fails_fast_once_open():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    client = InstrumentedRedis(host="127.0.0.1", port=1, socket_connect_timeout=0.5, breaker=breaker)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(RedisConnectionError):
+                await client.get("key")
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await client.get("key")
+        with pytest.raises(CircuitOpenError):
+            async with client.pipeline() as pipe:
+                pipe.get("key")
+                await pipe.execute()
+        await client.aclose()
+
+    asyncio.run(main())
+
+def test_exhausted_pool_is_not_a_redis_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60.0)
+    pool = BlockingConnectionPool(
+        max_connections=1, timeout=0.05,
+        connection_class=fakeredis.FakeAsyncConnection, server=fakeredis.FakeServer(),
+    )
+    client = InstrumentedRedis(connection_pool=pool, breaker=breaker)
+
+    async def main():
+        busy = await pool.get_connection()
+        with pytest.raises(RedisConnectionError, match="No connection available"):
+            await client.get("key")
+        assert breaker.state == "closed"
+        await pool.release(busy)
+        assert await client.get("key") is None
+
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+from app.db.pool import compute_pool_limits
+
+def test_pool_fits_into_server_limit():
+    # 3 pods (2 replicas + 1 surge) x 4 workers share 90 usable connections
+    limits = compute_pool_limits(max_connections=100, reserved_connections=10, instances=3, workers=4)
+    assert limits.budget == 7
+    assert limits.pool_size == 5
+    assert limits.max_overflow == 2
+    assert 3 * 4 * (limits.pool_size + limits.max_overflow) <= 90
+
+def test_dedicated_connections_come_off_the_budget():
+    limits = compute_pool_limits(max_connections=100, reserved_connections=10, instances=3, workers=4, dedicated=1)
+    assert limits.budget == 6
+    assert 3 * 4 * (limits.pool_size + limits.max_overflow + 1) <= 90
+
+def test_small_server_still_gets_one_connection():
+    limits = compute_pool_limits(max_connections=20, reserved_connections=5, instances=4, workers=8)
+    assert limits.pool_size == 1
+    assert limits.max_overflow == 0
+
+def test_explicit_values_take_precedence():
+    limits = compute_pool_limits(
+        max_connections=100, reserved_connections=10, instances=3, workers=4, pool_size=2, max_overflow=0
+    )
+    assert (limits.pool_size, limits.max_overflow) == (2, 0)
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.db.routing import REPLICA_LAG_QUERY, ReplicaRouter
+
+def make_router() -> ReplicaRouter:
+    router = ReplicaRouter(primary=MagicMock(name="primary"), replica=MagicMock(name="replica"))
+    router.ready = True
+    router._subscribed_at = time.monotonic() - 60
+    router.lag = 0.1
+    router._checked_at = time.monotonic()
+    return router
+
+def test_reads_go_to_replica_unless_lagging_or_sticky():
+    router = make_router()
+    assert router.choose(5) is router.replica
+
+    # A write by user 5 published on the invalidation channel (any worker)
+    router._on_message("5,6")
+    assert router.choose(5) is router.primary
+    assert router.choose(7) is router.replica
+
+    router.lag = 30.0
+    assert router.choose(7) is router.primary
+    router.lag = None
+    assert router.choose(7) is router.primary
+    assert router.reads == {"replica": 2, "no_replica": 0, "sticky": 1, "lagging": 2, "no_subscription": 0}
+
+def test_primary_only_without_fresh_measurement_or_subscription():
+    router = make_router()
+    router._checked_at -= 60
+    assert router.choose() is router.primary
+
+    router = make_router()
+    router._on_disconnect()
+    assert router.choose() is router.primary
+
+    # Sticky messages may have been missed while disconnected
+    with patch("app.db.routing.settings.DB_REPLICA_STICKY_SECONDS", 5.0):
+        router.ready = True
+        router._subscribed_at = time.monotonic()
+        assert router.choose() is router.primary
+
+def test_without_replica_everything_reads_from_primary():
+    router = ReplicaRouter(primary=MagicMock(name="primary"), replica=None)
+    assert router.choose(1) is router.primary
+    assert router.stats()["configured"] is False
+
+def test_disconnected_wal_receiver_means_unknown_lag():
+    # Both LSNs stand still without a receiver; only a streaming one counts as caught up
+    assert "pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL" in REPLICA_LAG_QUERY.text
+    assert REPLICA_LAG_QUERY.text.index("pg_stat_wal_receiver") < REPLICA_LAG_QUERY.text.index("pg_last_wal_receive_lsn")
+
+    router = make_router()
+    conn = AsyncMock()
+    conn.execute.return_value = MagicMock(scalar=MagicMock(return_value=None))
+    router.replica.connect.return_value.__aenter__.return_value = conn
+    assert asyncio.run(router.measure_lag()) is None
+    assert router.choose() is router.primary
+    assert router.reads["lagging"] == 1
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock
+
+from app.core.hash_pool import HashPool, HashPoolFullError
+from app.db.session import get_db
+from app.main import app
+
+client = TestClient(app)
+
+def test_hash_pool_runs_in_worker_thread():
+    pool = HashPool(kind="thread", workers=1, max_queue=0)
+    result = asyncio.run(pool.run(lambda: threading.current_thread().name))
+    assert result.startswith("password-hash")
+    assert pool.stats()["completed"] == 1
+    pool.shutdown()
+
+def test_hash_pool_rejects_when_full():
+    pool = HashPool(kind="thread", workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        busy = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        with pytest.raises(HashPoolFullError):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*busy)
+
+    asyncio.run(scenario())
+    assert pool.stats()["rejected"] == 1
+    assert pool.in_flight == 0
+    pool.shutdown()
+
+@patch("app.core.security.hash_pool.run", new_callable=AsyncMock)
+def test_register_returns_503_when_pool_is_full(mock_run):
+    mock_run.side_effect = HashPoolFullError()
+    app.dependency_overrides[get_db] = _fake_db
+    try:
+        response = client.post(
+            "/api/auth/register",
+            json={"username": "test", "email": "test@example.com", "password": "a" * 10},
+        )
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+async def _fake_db():
+    db = AsyncMock()
+    db.execute.return_value.scalar_one_or_none = lambda: None
+    yield db
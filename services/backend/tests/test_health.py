@@ -0,0 +1,74 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.core.health import HealthMonitor, check_database, check_db_pool
+from app.main import app
+
+client = TestClient(app)
+
+def test_ready_serves_cached_result():
+    monitor = HealthMonitor()
+    monitor.register("db", AsyncMock(return_value={}))
+    monitor.register("redis", AsyncMock(side_effect=ConnectionError("refused")))
+
+    with patch("app.core.health.health_monitor", monitor):
+        assert client.get("/api/ready").json()["status"] == "starting"
+
+        asyncio.run(monitor.check())
+        response = client.get("/api/ready")
+        assert response.status_code == 503
+        checks = response.json()["checks"]
+        assert checks["db"]["ok"] is True
+        assert checks["redis"] == {"ok": False, "error": "refused", "latency_ms": checks["redis"]["latency_ms"]}
+
+        monitor._checks["redis"] = AsyncMock(return_value={})
+        asyncio.run(monitor.check())
+        # Probes never run the checks themselves
+        client.get("/api/ready")
+        response = client.get("/api/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert monitor._checks["db"].await_count == 2
+
+def test_checks_run_concurrently_with_deadline():
+    async def hang():
+        await asyncio.sleep(10)
+
+    monitor = HealthMonitor()
+    monitor.register("slow", hang)
+    monitor.register("other", hang)
+    with patch("app.core.health.settings.HEALTH_CHECK_TIMEOUT", 0.1):
+        status_code, body = asyncio.run(asyncio.wait_for(monitor.check(), timeout=0.5))
+    assert status_code == 503
+    assert b"timed out" in body
+
+def test_stale_result_is_not_ready():
+    monitor = HealthMonitor()
+    monitor.register("db", AsyncMock(return_value={}))
+    asyncio.run(monitor.check())
+    assert monitor.response()[0] == 200
+    monitor._checked_at -= 60
+    assert monitor.response()[0] == 503
+
+def test_saturated_pool_keeps_the_worker_ready():
+    pool = MagicMock(_max_overflow=2)
+    pool.size.return_value = 3
+    pool.checkedout.return_value = 5
+    engine = MagicMock(pool=pool)
+    # The application pool has no connection left for the database check either
+    engine.connect.side_effect = TimeoutError("QueuePool limit reached")
+
+    monitor = HealthMonitor()
+    monitor.register("db_pool", check_db_pool)
+    monitor.register("db", check_database)
+    conn = AsyncMock()
+    health_engine = MagicMock()
+    health_engine.connect.return_value.__aenter__ = AsyncMock(return_value=conn)
+    health_engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+    with patch("app.db.session.engine", engine), patch("app.db.session.health_engine", health_engine):
+        status_code, body = asyncio.run(monitor.check())
+    assert status_code == 200
+    assert b'"saturation":1.0' in body
+    conn.execute.assert_awaited_once()
@@ -0,0 +1,65 @@
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi.testclient import TestClient
+from jose import jwt
+from jose.exceptions import JWTError
+
+from app.core.jwt_keys import KeyRing, load_keys
+from app.main import app
+
+client = TestClient(app)
+CLAIMS = {"sub": "1", "exp": 4102444800}
+
+def write_key(directory, kid, public_only=False):
+    key = ec.generate_private_key(ec.SECP256R1())
+    if public_only:
+        pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    else:
+        pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    (directory / f"{kid}.pem").write_bytes(pem)
+    return key
+
+def ring(directory, active_kid, accept_hs256=True):
+    return KeyRing(*load_keys(str(directory)), active_kid, "secret", "HS256", accept_hs256)
+
+def test_es256_tokens_carry_kid_and_survive_rotation(tmp_path):
+    write_key(tmp_path, "old")
+    old_token = ring(tmp_path, "old").encode(CLAIMS)
+    assert jwt.get_unverified_header(old_token)["kid"] == "old"
+
+    write_key(tmp_path, "new")
+    rotated = ring(tmp_path, "new")
+    new_token = rotated.encode(CLAIMS)
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert rotated.decode(old_token)["sub"] == rotated.decode(new_token)["sub"] == "1"
+    assert [key["kid"] for key in rotated.jwks["keys"]] == ["new", "old"]
+    assert {"kty", "crv", "x", "y", "alg", "use"} <= rotated.jwks["keys"][0].keys()
+
+def test_unknown_kid_and_retired_hs256_are_rejected(tmp_path):
+    write_key(tmp_path, "a")
+    legacy = jwt.encode(CLAIMS, "secret", algorithm="HS256")
+    assert ring(tmp_path, "a").decode(legacy)["sub"] == "1"
+    with pytest.raises(JWTError):
+        ring(tmp_path, "a", accept_hs256=False).decode(legacy)
+
+    foreign = tmp_path / "foreign"
+    foreign.mkdir()
+    write_key(foreign, "a")
+    with pytest.raises(JWTError):
+        ring(tmp_path, "a").decode(ring(foreign, "a").encode(CLAIMS))
+
+def test_active_kid_needs_a_private_key(tmp_path):
+    write_key(tmp_path, "retired", public_only=True)
+    with pytest.raises(ValueError):
+        ring(tmp_path, "retired")
+
+def test_jwks_endpoint_is_cacheable():
+    response = client.get("/api/.well-known/jwks.json", headers={"x-forwarded-proto": "https"})
+    assert response.status_code == 200
+    assert "keys" in response.json()
+    assert response.headers["cache-control"].startswith("public, max-age=")
@@ -0,0 +1,17 @@
+import os
+
+from app.core import logger as app_logger
+
+def test_listener_restarted_after_fork():
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            app_logger.start_listener()
+            app_logger.logger.warning("logged from a forked worker")
+            app_logger.listener.stop()  # drains the queue
+            ok = app_logger.log_stats()["queued"] == 0
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
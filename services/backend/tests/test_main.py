@@ -11,3 +11,15 @@ def test_health():
     response = client.get("/api/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+def test_stats_require_an_admin():
+    from app.api import deps
+    headers = {"x-forwarded-proto": "https"}
+    assert client.get("/api/stats", headers=headers).status_code == 401
+    app.dependency_overrides[deps.get_current_active_admin] = lambda: None
+    try:
+        response = client.get("/api/stats", headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert "password_hash" in response.json()
@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from prometheus_client import generate_latest
+
+from app.main import app
+
+client = TestClient(app)
+
+def test_requests_are_recorded_by_route():
+    client.get("/api/health")
+    body = generate_latest().decode()
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/health",status="200"}' in body
+    assert "db_pool_checkout_wait_seconds" in body
+    assert "password_hash_duration_seconds" in body
+
+def test_unmatched_paths_share_one_label():
+    client.get("/api/no-such-path-1")
+    client.get("/api/no-such-path-2")
+    body = generate_latest().decode()
+    assert 'route="unmatched"' in body
+    assert "no-such-path" not in body
+
+def test_metrics_are_not_served_by_the_api():
+    # Scraped from the gunicorn master on METRICS_PORT, never through the ingress
+    assert client.get("/api/metrics", headers={"x-forwarded-proto": "https"}).status_code == 404
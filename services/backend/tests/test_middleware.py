@@ -0,0 +1,44 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.core.middleware import HTTPSRedirectMiddleware, RequestLoggingMiddleware
+from app.main import app
+
+client = TestClient(app)
+
+def test_https_redirect_outside_debug():
+    with patch("app.core.middleware.settings.DEBUG", False):
+        response = client.get("/api/?x=1", follow_redirects=False)
+        assert response.status_code == 301
+        assert response.headers["location"] == "https://testserver/api/?x=1"
+
+        response = client.get("/api/", headers={"x-forwarded-proto": "https"})
+        assert response.status_code == 200
+
+        # Kubelet probes come over plain HTTP
+        response = client.get("/api/health", follow_redirects=False)
+        assert response.status_code == 200
+
+def test_unhandled_exception_becomes_500():
+    broken = FastAPI()
+    broken.add_middleware(HTTPSRedirectMiddleware)
+    broken.add_middleware(RequestLoggingMiddleware)
+
+    @broken.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    with patch("app.core.middleware.logger") as mock_logger:
+        response = TestClient(broken, raise_server_exceptions=False).get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal Server Error"}
+    mock_logger.exception.assert_called_once()
+    assert mock_logger.info.call_args.kwargs["extra"]["status"] == 500
+
+def test_successful_probes_are_not_logged():
+    with patch("app.core.middleware.logger") as mock_logger:
+        client.get("/api/health")
+        mock_logger.info.assert_not_called()
+        client.get("/api/")
+        mock_logger.info.assert_called_once()
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import inspect
+
+from app.core.principal_cache import PrincipalCache, principal_from_user, user_from_principal
+
+RECORD = {
+    "id": 7,
+    "username": "test",
+    "email": "test@example.com",
+    "is_active": True,
+    "role_id": 2,
+    "role": {"id": 2, "name": "user", "description": "Standard user role"},
+    "gen": 0,
+}
+
+def test_user_from_principal_is_detached_and_round_trips():
+    user = user_from_principal(RECORD)
+    assert inspect(user).detached
+    assert user.role_obj.name == "user"
+    assert principal_from_user(user) == RECORD
+
+@patch("app.core.principal_cache.redis_client.get", new_callable=AsyncMock)
+def test_local_tier_used_only_while_subscribed(mock_get):
+    mock_get.return_value = json.dumps(RECORD)
+    cache = PrincipalCache(local_size=10, local_ttl=60, redis_ttl=300)
+
+    # Pub/sub is down: every lookup goes to Redis
+    assert asyncio.run(cache.get(7)) == RECORD
+    assert asyncio.run(cache.get(7)) == RECORD
+    assert mock_get.call_count == 2
+
+    asyncio.run(cache._on_connect())
+    asyncio.run(cache.get(7))
+    asyncio.run(cache.get(7))
+    assert mock_get.call_count == 3
+
+    # Invalidation from another worker drops the local copy
+    cache._on_message("7")
+    asyncio.run(cache.get(7))
+    assert mock_get.call_count == 4
+
+@patch("app.core.principal_cache.redis_client.get", new_callable=AsyncMock)
+def test_redis_errors_fall_back_to_db(mock_get):
+    mock_get.side_effect = Exception("Connection error")
+    cache = PrincipalCache(local_size=10, local_ttl=60, redis_ttl=300)
+    assert asyncio.run(cache.get(7)) is None
+
+@patch("app.core.principal_cache.redis_client.set", new_callable=AsyncMock)
+def test_record_kept_locally_only_when_redis_took_it(mock_set):
+    cache = PrincipalCache(local_size=10, local_ttl=60, redis_ttl=300)
+    asyncio.run(cache._on_connect())
+
+    # SET NX lost to the tombstone of a concurrent invalidation
+    mock_set.return_value = None
+    asyncio.run(cache.set(RECORD))
+    assert cache.local.get(7) is None
+
+    mock_set.side_effect = Exception("Connection error")
+    asyncio.run(cache.set(RECORD))
+    assert cache.local.get(7) is None
+
+    mock_set.side_effect, mock_set.return_value = None, True
+    asyncio.run(cache.set(RECORD))
+    assert cache.local.get(7) == RECORD
+
+def test_invalidate_with_token_revocation_uses_one_pipeline():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipeline = MagicMock()
+    pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    cache = PrincipalCache(local_size=10, local_ttl=60, redis_ttl=300)
+    with patch("app.core.principal_cache.redis_client.pipeline", pipeline):
+        asyncio.run(cache.invalidate(7, 8, revoke_tokens=True))
+
+    pipeline.assert_called_once()
+    assert [c.args[0] for c in pipe.set.call_args_list] == ["principal:7", "principal:8"]
+    assert [c.args for c in pipe.hincrby.call_args_list] == [("user:sess:7", "gen", 1), ("user:sess:8", "gen", 1)]
+    pipe.publish.assert_called_once_with("principal:invalidate", "7,8")
+    pipe.execute.assert_awaited_once()
+
+def test_strict_invalidation_raises_redis_errors():
+    pipeline = MagicMock()
+    pipeline.return_value.__aenter__ = AsyncMock(side_effect=ConnectionError("redis down"))
+    pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    cache = PrincipalCache(local_size=10, local_ttl=60, redis_ttl=300)
+    with patch("app.core.principal_cache.redis_client.pipeline", pipeline):
+        asyncio.run(cache.invalidate(7))
+        with pytest.raises(ConnectionError):
+            asyncio.run(cache.invalidate(7, strict=True))
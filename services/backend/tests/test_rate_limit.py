@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core import rate_limit
+from app.core.rate_limit import Limit, RateLimit, TokenBuckets, client_ip, global_key
+
+def make_request(ip="10.0.0.1"):
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/auth/login",
+        "headers": [(b"x-forwarded-for", ip.encode())],
+        "client": ("127.0.0.1", 1234),
+    })
+
+def test_token_bucket_refills():
+    buckets = TokenBuckets(maxsize=10)
+    limit = Limit.parse("ip", "2/10", client_ip)
+    buckets.take("k", limit, now=0.0)
+    buckets.take("k", limit, now=0.0)
+    assert buckets.retry_after("k", limit, now=0.0) == pytest.approx(5.0)
+    assert buckets.retry_after("k", limit, now=5.0) == 0.0
+
+@patch.object(rate_limit, "local_buckets", TokenBuckets(maxsize=100))
+def test_burst_rejected_locally_without_redis():
+    limiter = RateLimit("test-local", Limit.parse("ip", "3/60", client_ip))
+    with patch.object(rate_limit, "_sliding_window", new_callable=AsyncMock, return_value=0) as script:
+        for _ in range(3):
+            asyncio.run(limiter(make_request()))
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(limiter(make_request()))
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "20"
+        assert script.call_count == 3
+
+        # Another IP has its own bucket
+        asyncio.run(limiter(make_request("10.0.0.2")))
+
+@patch.object(rate_limit, "local_buckets", TokenBuckets(maxsize=100))
+def test_all_limits_checked_in_one_redis_call():
+    limiter = RateLimit(
+        "test-redis",
+        Limit.parse("ip", "5/60", client_ip),
+        Limit.parse("global", "100/1", global_key),
+    )
+    with patch.object(rate_limit, "_sliding_window", new_callable=AsyncMock, return_value=1500) as script:
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(limiter(make_request()))
+    assert exc.value.headers["Retry-After"] == "2"
+    kwargs = script.call_args.kwargs
+    assert kwargs["keys"] == ["ratelimit:test-redis:ip:10.0.0.1", "ratelimit:test-redis:global:all"]
+    assert kwargs["args"][1:] == [60000, 5, 1000, 100]
+
+@patch.object(rate_limit, "local_buckets", TokenBuckets(maxsize=100))
+def test_redis_failure_follows_fail_open_setting():
+    limiter = RateLimit("test-fail", Limit.parse("ip", "5/60", client_ip))
+    with patch.object(rate_limit, "_sliding_window", new_callable=AsyncMock, side_effect=ConnectionError()):
+        with patch("app.core.rate_limit.settings.RATE_LIMIT_FAIL_OPEN", True):
+            asyncio.run(limiter(make_request()))
+        with patch("app.core.rate_limit.settings.RATE_LIMIT_FAIL_OPEN", False):
+            with pytest.raises(HTTPException) as exc:
+                asyncio.run(limiter(make_request()))
+            assert exc.value.status_code == 503
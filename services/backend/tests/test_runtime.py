@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+from app.core.runtime import cgroup_cpu_limit, worker_count
+
+def test_cgroup_cpu_limit(tmp_path):
+    assert cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("150000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+
+    # cgroup v2 takes precedence
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 2.5
+
+def test_worker_count():
+    with patch("app.core.runtime.settings.WEB_CONCURRENCY", None), \
+            patch("app.core.runtime.settings.WEB_WORKERS_PER_CPU", 1.0), \
+            patch("app.core.runtime.settings.WEB_MAX_WORKERS", 8):
+        assert worker_count(cpus=0.5) == 1
+        assert worker_count(cpus=2.5) == 3
+        assert worker_count(cpus=64) == 8
+    with patch("app.core.runtime.settings.WEB_CONCURRENCY", 4):
+        assert worker_count(cpus=64) == 4
@@ -0,0 +1,15 @@
+import json
+
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.serializers import user_response
+from app.schemas.user import User as UserSchema
+
+def test_user_response_matches_response_model_output():
+    role = Role(id=2, name="user", description=None)
+    user = User(id=7, username="alice", email="alice@example.com", hashed_password="x",
+                role_id=2, is_active=True, role_obj=role)
+
+    response = user_response(user)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == UserSchema.model_validate(user).model_dump(mode="json")
@@ -0,0 +1,116 @@
+import asyncio
+from unittest.mock import patch, AsyncMock
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+from redis.asyncio import ConnectionPool
+
+from app.core import security
+from app.core.redis import redis_client
+from app.core.sessions import SessionStore
+from app.main import app
+
+client = TestClient(app)
+HTTPS = {"x-forwarded-proto": "https"}
+RECORD = {
+    "id": 7,
+    "username": "test",
+    "email": "test@example.com",
+    "is_active": True,
+    "role_id": 2,
+    "role": {"id": 2, "name": "user", "description": None},
+    "gen": 3,
+}
+
+def get_me(token):
+    return client.get("/api/auth/me", headers={**HTTPS, "Authorization": f"Bearer {token}"})
+
+@patch("app.api.deps.principal_cache.get", new_callable=AsyncMock)
+def test_access_token_of_an_older_generation_is_revoked(mock_get):
+    mock_get.return_value = RECORD
+    assert get_me(security.create_access_token(7, gen=3)).status_code == 200
+
+    response = get_me(security.create_access_token(7, gen=2))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+@patch("app.api.deps.principal_cache.get", new_callable=AsyncMock)
+def test_refresh_token_is_not_an_access_token(mock_get):
+    mock_get.return_value = RECORD
+    assert get_me(security.create_refresh_token(7, family="f", gen=3)).status_code == 401
+
+@patch("app.api.endpoints.auth.sessions.rotate", new_callable=AsyncMock)
+def test_refresh_passes_the_token_family_to_rotate(mock_rotate):
+    mock_rotate.return_value = None
+    token = security.create_refresh_token(7, family="fam-1", seq=4, gen=3)
+    response = client.post("/api/auth/refresh", headers={**HTTPS, "Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    mock_rotate.assert_awaited_once()
+    assert mock_rotate.call_args.args == (7, "fam-1", 4, 3)
+    assert mock_rotate.call_args.kwargs["legacy"] is False
+
+@patch("app.api.endpoints.auth.sessions.rotate", new_callable=AsyncMock)
+def test_refresh_fails_closed_without_redis(mock_rotate):
+    mock_rotate.side_effect = ConnectionError("down")
+    token = security.create_refresh_token(7, family="fam-1", gen=0)
+    response = client.post("/api/auth/refresh", headers={**HTTPS, "Authorization": f"Bearer {token}"})
+    assert response.status_code == 503
+
+@pytest.fixture
+def store():
+    # The Lua scripts run for real, on an in-memory server
+    pool = redis_client.connection_pool
+    redis_client.connection_pool = ConnectionPool(
+        connection_class=fakeredis.FakeAsyncConnection, server=fakeredis.FakeServer(), decode_responses=True
+    )
+    yield SessionStore()
+    redis_client.connection_pool = pool
+
+def test_refresh_token_is_accepted_once(store):
+    async def scenario():
+        family, gen = await store.start(7)
+        assert await store.rotate(7, family, 1, gen) == gen
+        # Reused, or parallel to the refresh above
+        assert await store.rotate(7, family, 1, gen) is None
+        assert await store.rotate(7, family, 2, gen) == gen
+        # A token from the future of the family is no better
+        assert await store.rotate(7, family, 4, gen) is None
+    asyncio.run(scenario())
+
+def test_older_generation_is_rejected(store):
+    async def scenario():
+        family, gen = await store.start(7)
+        await redis_client.hincrby("user:sess:7", "gen", 1)
+        assert await store.rotate(7, family, 1, gen) is None
+        assert await store.rotate(7, family, 1, gen + 1) == gen + 1
+        # A new login starts in the current generation
+        assert (await store.start(7))[1] == gen + 1
+    asyncio.run(scenario())
+
+def test_legacy_token_is_accepted_once(store):
+    async def scenario():
+        assert await store.rotate(7, "jti-1", 0, 0, legacy=True, issued_at=100) == 0
+        assert await store.rotate(7, "jti-1", 0, 0, legacy=True, issued_at=100) is None
+        # Revoked through the keys written before token families existed
+        await redis_client.set("denylist:jti-2", "1")
+        assert await store.rotate(7, "jti-2", 0, 0, legacy=True, issued_at=100) is None
+        await redis_client.set("user:revoked_before:7", "100")
+        assert await store.rotate(7, "jti-3", 0, 0, legacy=True, issued_at=100) is None
+        assert await store.rotate(7, "jti-4", 0, 0, legacy=True, issued_at=101) == 0
+        # A family-less token is never legacy by accident
+        assert await store.rotate(7, "jti-5", 0, 0) is None
+    asyncio.run(scenario())
+
+def test_logout_ends_the_family(store):
+    async def scenario():
+        family, gen = await store.start(7)
+        other, _ = await store.start(7)
+        # Only the latest token of the family logs it out
+        assert not await store.end(7, family, 2)
+        assert await store.end(7, family, 1)
+        assert await store.rotate(7, family, 1, gen) is None
+        assert await store.rotate(7, other, 1, gen) == gen
+        assert await store.end(7, "jti-1", 0, legacy=True)
+        assert await store.rotate(7, "jti-1", 0, gen, legacy=True, issued_at=100) is None
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+
+from app.core import startup
+
+def test_warm_up_times_phases_and_survives_failures():
+    app = FastAPI()
+    with patch("app.core.startup.open_db_connections", AsyncMock(side_effect=OSError("refused"))) as db, \
+            patch("app.core.startup.open_redis_connections", AsyncMock()) as redis, \
+            patch("app.core.startup.start_hash_pool", AsyncMock()) as hashing, \
+            patch("app.core.startup.logger") as mock_logger:
+        timings = asyncio.run(startup.warm_up(app))
+
+    db.assert_awaited_once_with(startup.settings.STARTUP_DB_CONNECTIONS)
+    redis.assert_awaited_once_with(startup.settings.STARTUP_REDIS_CONNECTIONS)
+    hashing.assert_awaited_once()
+    assert "refused" in mock_logger.warning.call_args.args[0]
+    assert {"db", "redis", "hash_pool", "openapi", "warm_up"} <= set(timings)
+    # Built once and cached for /openapi.json
+    assert app.openapi_schema is not None
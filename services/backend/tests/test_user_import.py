@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints.admin import import_users
+from app.core.user_import import ImportBusyError, ImportFormatError, UserImport, parse_records
+
+
+def parse(chunks, fmt="csv"):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [record async for record in parse_records(stream(), fmt)]
+    return asyncio.run(collect())
+
+def test_csv_quoted_field_across_lines_and_chunks():
+    data = 'username,email,password\r\n"a\nb",a@example.com,password1\r\nc,c@example.com\n'.encode()
+    records = parse([data[:5], data[5:30], data[30:]])
+    assert records == [
+        (1, {"username": "a\nb", "email": "a@example.com", "password": "password1"}, None),
+        (2, None, "Expected 3 columns, got 2"),
+    ]
+
+def test_csv_stray_quote_stays_in_its_row():
+    data = b'username,email\nab"c,a@example.com\n"x""\ny",b@example.com\nd,d@example.com\n'
+    assert parse([data]) == [
+        (1, {"username": 'ab"c', "email": "a@example.com"}, None),
+        (2, {"username": 'x"\ny', "email": "b@example.com"}, None),
+        (3, {"username": "d", "email": "d@example.com"}, None),
+    ]
+
+def test_csv_unterminated_quote_fails_one_row():
+    data = b'username,email\n"a,a@example.com\nb,b@example.com\n'
+    with patch("app.core.user_import.settings.IMPORT_MAX_RECORD_SIZE", 20):
+        records = parse([data])
+    assert records == [
+        (1, None, "Unterminated quoted field"),
+        (2, {"username": "b", "email": "b@example.com"}, None),
+    ]
+    # At the end of the upload the same applies without reaching the cap
+    assert parse([data]) == records
+
+def test_csv_utf8_bom_and_empty_cells():
+    records = parse(["﻿username,email,role\nи,i@example.com,\n".encode()])
+    assert records == [(1, {"username": "и", "email": "i@example.com"}, None)]
+
+def test_csv_without_header():
+    with pytest.raises(ImportFormatError):
+        parse([b""])
+
+def test_ndjson_bad_lines_are_row_errors():
+    records = parse([b'{"email": "a@example.com"}\n\n[1]\n{bad'], fmt="ndjson")
+    assert records == [
+        (1, {"email": "a@example.com"}, None),
+        (2, None, "Expected a JSON object"),
+        (3, None, "Invalid JSON"),
+    ]
+
+def test_second_import_is_rejected_before_it_starts():
+    started = []
+
+    async def slow_run(self, chunks, fmt):
+        started.append(self)
+        await asyncio.sleep(0.05)
+        return {}
+
+    async def both():
+        first = asyncio.create_task(UserImport(None).run(None, "csv"))
+        await asyncio.sleep(0)
+        with pytest.raises(ImportBusyError):
+            await UserImport(None).run(None, "csv")
+        await first
+        # Free again once the first one is done
+        await UserImport(None).run(None, "csv")
+
+    with patch.object(UserImport, "_run", slow_run):
+        asyncio.run(both())
+    assert len(started) == 2
+
+def test_updates_are_invalidated_before_the_commit():
+    async def merged(self, chunks, fmt):
+        self.updated_ids, self.revoked_ids = [3, 4, 5], [4]
+        return {"rows": 3, "inserted": 0, "updated": 3, "failed": 0, "seconds": 0.1}
+
+    db = AsyncMock()
+    admin = MagicMock(id=1)
+    with patch.object(UserImport, "_run", merged), \
+         patch("app.api.endpoints.admin.principal_cache") as cache, \
+         patch("app.api.endpoints.admin.replica_router") as router:
+        router.stick = AsyncMock()
+        cache.invalidate = AsyncMock()
+        asyncio.run(import_users(MagicMock(), on_conflict="update", db=db, current_user=admin))
+        # Role changes need the cache gone, password or status changes the tokens too
+        assert cache.invalidate.await_args_list[0].args == (3, 5)
+        assert cache.invalidate.await_args_list[0].kwargs == {"strict": True}
+        cache.invalidate.assert_awaited_with(4, revoke_tokens=True)
+        db.commit.assert_awaited_once()
+
+        db.reset_mock()
+        cache.invalidate.side_effect = ConnectionError("redis down")
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(import_users(MagicMock(), on_conflict="update", db=db, current_user=admin))
+    assert e.value.status_code == 503
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
@@ -46,7 +46,8 @@ export default function AdminPage() {
       const params = new URLSearchParams({
         page: page.toString(),
         limit: limit.toString(),
-        search: debouncedSearch,
+        // The API rejects search terms shorter than 3 characters
+        search: debouncedSearch.trim().length >= 3 ? debouncedSearch.trim() : '',
         sort,
       });
       if (role !== 'all') params.append('role', role);